@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+HTTP render/export API.
+
+A plain ASGI app (no web framework) over the same pipeline as the UI and batch_export.py:
+
+    POST /normalize                    resume JSON -> normalized resume JSON
+    POST /render/html?template=...     resume JSON -> text/html
+    POST /export/pdf?template=...      resume JSON -> application/pdf   (&engine=weasyprint|reportlab)
+    POST /export/docx?template=...     resume JSON -> .docx
+    GET  /templates, GET /healthz
+
+Rendering and export run in a pool of worker processes so the event loop only parses requests
+and streams bytes. Every response carries a Server-Timing header (queue wait plus each stage) and
+X-Response-Time-Ms.
+
+    python api.py --port 8080 --workers 4      # needs uvicorn (pip install uvicorn)
+    uvicorn api:app --port 8080                # or any ASGI server
+"""
+
+import os, sys, json, time, signal, asyncio, argparse, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from resume_model import normalize_resume
+from templates import get_available_templates, render_template_html
+from exporters import export_pdf_from_html, export_pdf_from_data, export_docx_from_data, resolve_pdf_engine
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+MAX_BODY_BYTES = int(os.getenv("API_MAX_BODY_BYTES", str(1024 * 1024)))
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# --- Worker jobs (run in the pool; return (body, content type, stage timings)) ---
+def _warm_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is the server's to handle; it shuts the pool down
+    # templates compile at import; also parse the WeasyPrint stylesheets when that engine is in use
+    if resolve_pdf_engine() == "weasyprint":
+        try:
+            from exporters import get_pdf_stylesheet
+            for name in get_available_templates():
+                get_pdf_stylesheet(name)
+        except Exception:
+            pass
+
+def _timed(timings: Dict[str, float], stage: str, fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    timings[stage] = time.perf_counter() - t0
+    return out
+
+def job(kind: str, doc: Any, template_name: str, engine: str) -> Tuple[bytes, str, Dict[str, float]]:
+    timings = {}
+    data = _timed(timings, "normalize", normalize_resume, doc)
+    if kind == "normalize":
+        return json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json", timings
+    if kind == "html":
+        html = _timed(timings, "render", render_template_html, data, template_name)
+        return html.encode("utf-8"), "text/html; charset=utf-8", timings
+    if kind == "pdf":
+        if engine == "reportlab":
+            pdf = _timed(timings, "export", export_pdf_from_data, data, template_name)
+        else:
+            html = _timed(timings, "render", render_template_html, data, template_name, False)
+            pdf = _timed(timings, "export", export_pdf_from_html, html, template_name)
+        return pdf, PDF_MIME, timings
+    if kind == "docx":
+        return _timed(timings, "export", export_docx_from_data, data, template_name), DOCX_MIME, timings
+    raise ValueError(f"unknown job {kind!r}")
+
+def _ping() -> int:
+    return os.getpid()
+
+ROUTES = {
+    "/normalize": "normalize",
+    "/render/html": "html",
+    "/export/pdf": "pdf",
+    "/export/docx": "docx",
+}
+
+# --- ASGI app ---
+class ResumeAPI:
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = workers or int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+        self.max_pending = max_pending or int(os.getenv("API_MAX_PENDING", str(self.workers * 8)))
+        self._executor = None
+        self._pending = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the server process has event-loop and server threads that must not be forked
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def warm(self):
+        """Start every worker now (the executor spawns them lazily) so the first requests don't
+        pay for interpreter startup and template compilation."""
+        loop, pool = asyncio.get_running_loop(), self._pool()
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.warm()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        start = time.perf_counter()
+        timings = {}
+        try:
+            status, body, content_type = await self._handle(scope, receive, timings)
+        except ApiError as e:
+            status, body, content_type = e.status, _error(str(e)), "application/json"
+        except Exception as e:
+            status, body, content_type = 500, _error(f"{type(e).__name__}: {e}"), "application/json"
+        total = time.perf_counter() - start
+        timings["total"] = total
+        headers = [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            (b"server-timing", ", ".join(f"{k};dur={v * 1000:.2f}" for k, v in timings.items()).encode()),
+            (b"x-response-time-ms", f"{total * 1000:.2f}".encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _handle(self, scope, receive, timings) -> Tuple[int, bytes, str]:
+        path, method = scope["path"].rstrip("/") or "/", scope["method"]
+        if path == "/healthz":
+            return 200, b'{"ok":true}', "application/json"
+        if path == "/templates":
+            return 200, json.dumps(list(get_available_templates())).encode(), "application/json"
+        kind = ROUTES.get(path)
+        if kind is None:
+            raise ApiError(404, f"no route for {path}")
+        if method != "POST":
+            raise ApiError(405, f"{path} only accepts POST")
+
+        query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        template_name = query.get("template", "Modern Clean")
+        if template_name not in get_available_templates():
+            raise ApiError(422, f"unknown template {template_name!r}; see GET /templates")
+        engine = query.get("engine")
+        if engine and engine not in ("auto", "weasyprint", "reportlab"):
+            raise ApiError(422, f"unknown engine {engine!r}")
+
+        raw = await _read_body(receive)
+        try:
+            doc = json.loads(raw or b"{}")
+        except ValueError as e:
+            raise ApiError(400, f"body is not valid JSON: {e}")
+        if not isinstance(doc, dict):
+            raise ApiError(400, "body must be a JSON object")
+
+        if self._pending >= self.max_pending:
+            raise ApiError(503, f"{self.max_pending} jobs already pending; retry shortly")
+        self._pending += 1
+        pool = self._pool()
+        try:
+            t0 = time.perf_counter()
+            body, content_type, stages = await asyncio.get_running_loop().run_in_executor(
+                pool, job, kind, doc, template_name, resolve_pdf_engine(engine))
+        except BrokenProcessPool:
+            # a worker died: reap the broken pool's processes; the next request starts a fresh one
+            # (unless a concurrent request failing on the same pool already has)
+            if self._executor is pool:
+                self._executor = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise ApiError(503, "worker pool restarted; retry")
+        finally:
+            self._pending -= 1
+        timings["queue"] = max(time.perf_counter() - t0 - sum(stages.values()), 0.0)
+        timings.update(stages)
+        return 200, body, content_type
+
+async def _read_body(receive) -> bytes:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ApiError(400, "client disconnected")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ApiError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}).encode("utf-8")
+
+app = ResumeAPI()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the resume render/export API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="render/export worker processes (API_WORKERS)")
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is not installed: pip install uvicorn (or run api:app under any ASGI server)", file=sys.stderr)
+        return 2
+    uvicorn.run(ResumeAPI(workers=args.workers), host=args.host, port=args.port, log_level="info")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
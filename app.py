@@ -1,68 +1,30 @@
 import os
+import time
+import uuid
+from functools import partial, lru_cache, wraps
 import streamlit as st
 from dotenv import load_dotenv
 from chat_handler import ChatHandler
-from templates import get_available_templates, render_template_html
-from exporters import export_pdf_from_html, export_docx_from_data
+from templates import get_available_templates, render_template_html_cached
+from resume_merge import merge_delta
+from resume_model import Resume, EMPTY_RESUME, to_plain_dict
+from exporters import export_docx_from_data, export_pdf_from_data, resolve_pdf_engine
+from prefetch import get_shared_prefetcher
+from pdf_pool import (export_pdf, get_shared_pdf_pool, BrokenProcessPool, PoolBusyError,
+                      TimeoutError as PDFTimeoutError)
+from telemetry import start_run, span, record, current_run
+from session_store import get_session_store
+from fit import auto_fit_scale, estimate_fit
 
 load_dotenv()
 st.set_page_config(page_title="AI Resume Builder", page_icon="🤖", layout="wide", initial_sidebar_state="collapsed")
 
-def normalize_resume(d):
-    """Ensure all keys exist and types are what templates expect."""
-    d = dict(d or {})
-    d.setdefault("name", "")
-    d.setdefault("title", "")
-    d.setdefault("summary", "")
-    d.setdefault("contact", {})
-    d.setdefault("experience", [])
-    d.setdefault("education", [])
-    d.setdefault("skills", {})
-
-    # contact defaults
-    c = d["contact"] = dict(d["contact"] or {})
-    for k in ("email","phone","location","linkedin","github"):
-        c.setdefault(k, "")
-
-    # experience list sanity
-    fixed_exp = []
-    for e in d["experience"]:
-        e = dict(e or {})
-        e.setdefault("title","")
-        e.setdefault("company","")
-        e.setdefault("location","")
-        e["start_date"] = (e.get("start_date") or "").strip()
-        e["end_date"]   = (e.get("end_date") or "").strip() or "Present"
-        # bullets/technologies lists
-        b = e.get("bullets")
-        if b is None and e.get("description"):
-            b = [e["description"]]
-        if not isinstance(b, list): b = [str(b)] if b else []
-        e["bullets"] = b
-        t = e.get("technologies")
-        if not isinstance(t, list): t = [str(t)] if t else []
-        e["technologies"] = t
-        fixed_exp.append(e)
-    d["experience"] = fixed_exp
-
-    # education list sanity
-    fixed_edu = []
-    for e in d["education"]:
-        e = dict(e or {})
-        for k in ("school","degree","location","start_date","end_date"):
-            e.setdefault(k,"")
-        det = e.get("details")
-        if not isinstance(det, list): det = [str(det)] if det else []
-        e["details"] = det
-        fixed_edu.append(e)
-    d["education"] = fixed_edu
-
-    # skills dict sanity
-    sk = d["skills"] = dict(d["skills"] or {})
-    for k in ("design","frontend","backend","data_ai","tools","other"):
-        v = sk.get(k)
-        if not isinstance(v, list): sk[k] = [str(v)] if v else []
-    return d
+# Minimum seconds between chat repaints while a reply streams in
+STREAM_PAINT_INTERVAL = 0.05
+# Chat messages shown at once; "Load earlier" pages back by this many
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "30"))
+# Show the per-phase timing panel under the page
+SHOW_TIMINGS = os.getenv("RESUME_DEBUG_TIMINGS", "0").lower() in ("1", "true", "yes")
 
 # ---------- TITLE ----------
 
@@ -248,54 +210,116 @@ html, body, .stApp, .main { background: #87CEEB !important; }
 
 
 # ---------- INIT STATE FIRST ----------
+sessions = get_session_store()
+# Kept in the session store between runs (when enabled) rather than in st.session_state; the
+# resume itself is stored separately (a Resume in memory, its dict form on disk)
+STORED_KEYS = ("messages", "selected_template", "auto_fit")
+
+def stored_session_id(sid) -> bool:
+    """Whether ?sid= names a session this server minted: a uuid4 hex that is in the store.
+    Anything else gets a fresh id, so a link can't plant a chosen id on a new session."""
+    if not sid or len(sid) != 32 or sid.strip("0123456789abcdef"):
+        return False
+    if uuid.UUID(hex=sid).version != 4:
+        return False
+    return sessions.load(sid) is not None
+
 def init_state():
+    if "session_id" not in st.session_state:
+        # ?sid= in the URL lets a reconnect or a server restart rehydrate the same session. It is the
+        # only credential for that stored session, so only ids minted here (a random uuid4) are used
+        sid = st.query_params.get("sid") if sessions else None
+        st.session_state.session_id = sid if stored_session_id(sid) else uuid.uuid4().hex
+        if sessions:
+            st.query_params["sid"] = st.session_state.session_id
+    if sessions and "resume" not in st.session_state:
+        saved = sessions.load(st.session_state.session_id)
+        if saved:
+            for k in STORED_KEYS:
+                if k in saved:
+                    st.session_state[k] = saved[k]
+            if "_resume" in saved:
+                st.session_state.resume = saved["_resume"]
+            elif "resume_data" in saved:
+                st.session_state.resume = Resume.from_dict(saved["resume_data"])
     if "messages" not in st.session_state:
         st.session_state.messages = [
             {"role": "assistant",
              "content": "Hi! I’m your AI resume assistant. Tell me about your background, work experience, and skills. I’ll build your resume and ask for any missing pieces."}
         ]
-    if "resume_data" not in st.session_state:
-        st.session_state.resume_data = {
-            "name": "",
-            "title": "",
-            "contact": {"email": "", "phone": "", "location": "", "linkedin": "", "github": ""},
-            "summary": "",
-            "experience": [],
-            "education": [],
-            "skills": {"design": [], "frontend": [], "backend": [], "data_ai": [], "tools": [], "other": []}
-        }
+    if "resume" not in st.session_state:
+        # the session's only copy of the resume: validated and immutable, replaced when a delta
+        # changes it (its as_dict() is what chat, preview and export read)
+        st.session_state.resume = EMPTY_RESUME
+    if "chat_limit" not in st.session_state:
+        st.session_state.chat_limit = CHAT_PAGE_SIZE
     if "selected_template" not in st.session_state:
         st.session_state.selected_template = "Modern Clean"
+    if "auto_fit" not in st.session_state:
+        st.session_state.auto_fit = False
     if "chat_handler" not in st.session_state:
         st.session_state.chat_handler = ChatHandler()
 
 init_state()
-
-# ---------- SPLIT LAYOUT ----------
-# Title - using st.title instead of custom HTML
-st.title("🤖 AI Resume Builder")
-
-col_left, col_right = st.columns([1,1], gap="small")
-
-# ===== LEFT COLUMN =====
-with col_left:
-    # Anchor the column so CSS can style this real container
-    st.markdown('<span class="left-anchor"></span>', unsafe_allow_html=True)
-
-    # Build chat window as ONE markdown block so messages are truly nested
-    from html import escape
-    chat_html = '<div class="chat-window"><div class="chat-scroll">'
-    for m in st.session_state.messages:
-        role = "user" if m["role"] == "user" else "bot"
-        content = escape(m["content"]).replace("\n", "<br>")
-        chat_html += f'<div class="msg {role}">{content}</div>'
-    
-    # No typing indicator for now - using immediate responses
-    
-    chat_html += '</div></div>'
-    
-    # Add JavaScript to auto-scroll to bottom and handle Enter key
-    chat_html += '''
+timings = start_run(st.session_state.session_id)
+
+def mark_dirty():
+    st.session_state.state_dirty = True
+
+def persist_state():
+    """Hand the session's state to the store (written to disk only if it changed) and drop it
+    from st.session_state, so RAM is bounded by the store's hot LRU, not by open tabs."""
+    if not sessions:
+        return
+    with span("persist_state"):
+        state = {k: st.session_state[k] for k in STORED_KEYS}
+        state["_resume"] = st.session_state.resume  # memory-only: not serialized
+        # what gets written to disk; the memoized as_dict() is shared, not a copy
+        state["resume_data"] = st.session_state.resume.as_dict()
+        sessions.save(st.session_state.session_id, state, dirty=st.session_state.pop("state_dirty", False))
+        for k in STORED_KEYS + ("resume",):
+            st.session_state.pop(k, None)
+
+def rerun(scope="app"):
+    # st.rerun() ends the script (or fragment) by raising, so persist and close its timings first
+    persist_state()
+    run = current_run()
+    if run is not None:
+        st.session_state.last_timings = run
+        run.finish()
+    if run is None or run.scope != "fragment":
+        scope = "app"  # a fragment drawn as part of a full run can't rerun on its own
+    st.rerun(scope=scope)
+
+def session_fragment(fn):
+    """st.fragment whose own reruns load the session, time themselves and persist just like a
+    full script run; when called inside a full run it is timed as one phase of that run."""
+    @wraps(fn)
+    def body():
+        if current_run() is not None:
+            with span(fn.__name__):
+                fn()
+            return
+        run = start_run(st.session_state.session_id, scope="fragment")
+        init_state()
+        fn()
+        persist_state()
+        st.session_state.last_timings = run
+        run.finish()
+    return st.fragment(body)
+
+# Start the PDF worker processes (and their WeasyPrint import) before anyone clicks export; the
+# ReportLab engine exports in-process and never uses them
+with span("startup"):
+    if resolve_pdf_engine() == "weasyprint":
+        get_shared_pdf_pool()
+    prefetcher = get_shared_prefetcher()
+
+# ---------- RENDER HELPERS ----------
+slots = {}  # placeholders drawn inside fragments that the rest of this run writes to
+from html import escape
+
+CHAT_SCRIPT = """
     <script>
     // Auto-scroll to bottom when new messages are added
     function scrollToBottom() {
@@ -323,9 +347,120 @@ with col_left:
         }
     });
     </script>
-    '''
-    
-    st.markdown(chat_html, unsafe_allow_html=True)
+    """
+
+TYPING_INDICATOR = ('<div class="typing-indicator"><span class="typing-dots">'
+                    '<span class="typing-dot"></span><span class="typing-dot"></span><span class="typing-dot"></span>'
+                    '</span></div>')
+
+@lru_cache(maxsize=4096)
+def message_html(role, content):
+    """One chat bubble; messages never change once sent, so each is escaped once per process."""
+    cls = "user" if role == "user" else "bot"
+    return f'<div class="msg {cls}">{escape(content).replace(chr(10), "<br>")}</div>'
+
+def chat_window_html(messages, pending_reply=None, limit=None):
+    """Build the chat window as ONE markdown block so messages are truly nested.
+    Only the last `limit` messages are included; pending_reply is the partially streamed
+    assistant text, shown as a trailing bubble."""
+    shown = messages[-limit:] if limit else messages
+    parts = ['<div class="chat-window"><div class="chat-scroll">']
+    parts.extend(message_html(m["role"], m["content"]) for m in shown)
+    if pending_reply is not None:
+        if pending_reply.strip():
+            # still growing, so not worth caching
+            parts.append(f'<div class="msg bot">{escape(pending_reply.strip()).replace(chr(10), "<br>")}</div>')
+        else:
+            parts.append(TYPING_INDICATOR)
+    parts.append('</div></div>')
+    parts.append(CHAT_SCRIPT)
+    return "".join(parts)
+
+def load_earlier():
+    st.session_state.chat_limit += CHAT_PAGE_SIZE
+
+@lru_cache(maxsize=256)
+def page_fit(resume, template_name, auto_fit):
+    """One-page fit estimate (and auto-fit zoom) for a resume; Resume is hashable, so reruns and
+    fragments that didn't change it reuse the result."""
+    with span("fit", auto=auto_fit):
+        if auto_fit:
+            return auto_fit_scale(resume.as_dict(), template_name)
+        return estimate_fit(resume.as_dict(), template_name)
+
+def fit_caption(fit):
+    if fit.fits:
+        return "✅ Fits on one page" + (f" (scaled to {fit.scale:.0%})" if fit.scale < 1 else "")
+    return f"⚠️ About {fit.overflow / fit.available:.0%} of a page too long" + (
+        f", even at {fit.scale:.0%}" if fit.scale < 1 else "")
+
+def render_preview(slot, resume, template_name, fit):
+    """Render the single-page "doc" into slot and return its HTML."""
+    safe_data = resume.as_dict()
+    with span("render_html", template=template_name):
+        html = render_template_html_cached(safe_data, template_name, scale=fit.scale)
+    with slot.container():
+        # Safety: if HTML is empty, show a tiny diagnostic
+        if not html or not html.strip():
+            st.warning("Template returned empty HTML. Showing raw data for debugging:")
+            st.json(safe_data)
+        else:
+            st.markdown('<span class="doc-anchor"></span>', unsafe_allow_html=True)
+            with span("iframe", bytes=len(html)):
+                # scroll rather than silently clip when the content runs past one page
+                st.components.v1.html(html, height=1056, scrolling=not fit.fits)
+    return html
+
+def apply_delta(delta):
+    """Merge the LLM delta into the session resume; returns the changed paths (empty for a no-op)."""
+    with span("apply_delta") as attrs:
+        data = to_plain_dict(st.session_state.resume)
+        changed = merge_delta(data, delta)
+        attrs["changed"] = len(changed)
+        if changed:
+            st.session_state.resume = Resume.from_dict(data)
+            mark_dirty()
+            if prefetcher:
+                prefetcher.discard_session(st.session_state.session_id)
+    return changed
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+def export_filename(name, ext):
+    # Format name for filename: "FirstName_LastName"
+    name_parts = (name or "").split()
+    if len(name_parts) >= 2:
+        return f"Resume_{name_parts[0]}_{name_parts[-1]}.{ext}"
+    if name_parts:
+        return f"Resume_{name_parts[0]}.{ext}"
+    return f"Resume.{ext}"
+
+# Export builders take plain values (no st.* calls) so the prefetcher can run them off-thread
+def build_pdf(resume, template_name, scale=1.0):
+    if resolve_pdf_engine() == "reportlab":
+        return export_pdf_from_data(resume.as_dict(), template_name, scale)
+    export_html = render_template_html_cached(resume.as_dict(), template_name, inline_css=False)
+    return export_pdf(export_html, template_name, scale=scale)
+
+def build_docx(resume, template_name):
+    return export_docx_from_data(resume.as_dict(), template_name)
+
+# ---------- SPLIT LAYOUT ----------
+# The chat column and the toolbar are fragments: sending a message, paging the transcript or
+# exporting reruns only that fragment, not the CSS, the other column or the preview. The preview
+# is redrawn only by full reruns, which happen when the resume or the template changed.
+
+@session_fragment
+def chat_column():
+    hidden = len(st.session_state.messages) - st.session_state.chat_limit
+    if hidden > 0:
+        st.button(f"Load earlier messages ({hidden})", on_click=load_earlier)
+
+    chat_slot = st.empty()
+    with span("chat_window", messages=min(len(st.session_state.messages), st.session_state.chat_limit)):
+        chat_slot.markdown(chat_window_html(st.session_state.messages, limit=st.session_state.chat_limit),
+                           unsafe_allow_html=True)
 
     # Pinned input: container + hidden anchor so CSS grabs this parent
     input_box = st.container()
@@ -343,82 +478,169 @@ with col_left:
             if send and user_text.strip():
                 # Add user message immediately
                 st.session_state.messages.append({"role":"user","content":user_text.strip()})
-                
-                # Process AI response (no intermediate rerun)
-                assistant_text, delta = st.session_state.chat_handler.process_message(user_text, st.session_state.resume_data)
-                if delta:
-                    # Simple update: replace the fields that changed
-                    for k, v in delta.items():
-                        st.session_state.resume_data[k] = v
-                
-                # Add AI response immediately
-                st.session_state.messages.append({"role":"assistant","content":assistant_text or "Got it—what dates for that role?"})
-                st.rerun()
-
-# ===== RIGHT COLUMN =====
-with col_right:
-    # Anchor so CSS styles this real column container
-    st.markdown('<span class="right-anchor"></span>', unsafe_allow_html=True)
-
-    # Toolbar (normal Streamlit)
+                mark_dirty()
+
+                if getattr(st.session_state.chat_handler, "streaming", False):
+                    # kept in session state so a full rerun can pick the stream up (stream_reply)
+                    st.session_state.reply_stream = {
+                        "events": st.session_state.chat_handler.stream_message(user_text, st.session_state.resume.as_dict()),
+                        "reply": "",
+                    }
+                    stream_reply(chat_slot)
+                else:
+                    # Process AI response (no intermediate rerun)
+                    assistant_text, delta = st.session_state.chat_handler.process_message(user_text, st.session_state.resume.as_dict())
+                    changed = apply_delta(delta) if delta else set()
+
+                    # Add AI response immediately
+                    st.session_state.messages.append({"role":"assistant","content":assistant_text or "Got it—what dates for that role?"})
+                    mark_dirty()
+                    # the preview is outside this fragment, so a resume change reruns the whole page
+                    rerun("app" if changed else "fragment")
+    slots["chat"] = chat_slot
+
+def stream_reply(chat_slot, doc_slot=None):
+    """Stream the assistant's reply (st.session_state.reply_stream) into the chat window.
+
+    In the chat fragment (no doc_slot) the reply streams without touching the rest of the page.
+    The preview is outside the fragment, so the first delta that changes the resume reruns the
+    whole app; that run draws the new preview and resumes the stream below it (with doc_slot),
+    where any later delta redraws the preview in place."""
+    stream = st.session_state.reply_stream
+    last_paint = 0.0
+    paints, paint_time = 0, 0.0  # summed into one span rather than one per repaint
+    chat_slot.markdown(chat_window_html(st.session_state.messages, pending_reply=stream["reply"], limit=st.session_state.chat_limit), unsafe_allow_html=True)
+    for kind, payload in stream["events"]:
+        if kind == "text":
+            stream["reply"] += payload
+            now = time.monotonic()
+            if now - last_paint >= STREAM_PAINT_INTERVAL:
+                chat_slot.markdown(chat_window_html(st.session_state.messages, pending_reply=stream["reply"], limit=st.session_state.chat_limit), unsafe_allow_html=True)
+                last_paint = now
+                paints += 1
+                paint_time += time.monotonic() - now
+        elif kind == "delta" and payload and apply_delta(payload):
+            if doc_slot is None:
+                record("stream_paint", paint_time, paints=paints)
+                rerun("app")
+            resume, template_name = st.session_state.resume, st.session_state.selected_template
+            render_preview(doc_slot, resume, template_name, page_fit(resume, template_name, st.session_state.auto_fit))
+    del st.session_state.reply_stream
+    record("stream_paint", paint_time, paints=paints)
+    st.session_state.messages.append({"role":"assistant","content":stream["reply"].strip() or "Got it—what dates for that role?"})
+    mark_dirty()
+    chat_slot.markdown(chat_window_html(st.session_state.messages, limit=st.session_state.chat_limit), unsafe_allow_html=True)
+
+@session_fragment
+def toolbar():
     c1, c2, c3, c4 = st.columns([2,2,1,1])
     with c1:
         templates = get_available_templates()
+        previous_template = st.session_state.get("selected_template", "Modern Clean")
         st.session_state.selected_template = st.selectbox(
             "Template",
             options=list(templates.keys()),
-            index=list(templates.keys()).index(st.session_state.get("selected_template","Modern Clean"))
+            index=list(templates.keys()).index(previous_template)
         )
+        if st.session_state.selected_template != previous_template:
+            mark_dirty()
+            rerun()  # redraw the preview in the new template
+    resume = st.session_state.resume
+    template_name = st.session_state.selected_template
+    fit = page_fit(resume, template_name, st.session_state.auto_fit)
+    # exports are content-addressed: the same resume + template + zoom is the same file
+    artifact_key = (template_name, resume, fit.scale)
+    with span("prefetch_lookup"):
+        ready_pdf = prefetcher.get(artifact_key, "pdf") if prefetcher else None
+        ready_docx = prefetcher.get(artifact_key, "docx") if prefetcher else None
     with c2:
-        st.caption("Download when you’re happy. The preview matches the export.")
+        auto_fit = st.checkbox("Fit to one page", value=st.session_state.auto_fit,
+                               help="Shrink text and spacing (down to 80%) so the resume fits one page")
+        if auto_fit != st.session_state.auto_fit:
+            st.session_state.auto_fit = auto_fit
+            mark_dirty()
+            rerun()  # redraw the preview at the new zoom
+        st.caption(fit_caption(fit))
     with c3:
-        export_pdf = st.button("📄 PDF")
+        # a speculatively exported file downloads straight away; otherwise export on click
+        if ready_pdf is not None:
+            st.download_button("📄 PDF", ready_pdf, file_name=export_filename(resume.name, "pdf"), mime=PDF_MIME)
+            export_pdf_clicked = False
+        else:
+            export_pdf_clicked = st.button("📄 PDF")
     with c4:
-        export_docx = st.button("📝 DOCX")
+        if ready_docx is not None:
+            st.download_button("📝 DOCX", ready_docx, file_name=export_filename(resume.name, "docx"), mime=DOCX_MIME)
+            export_docx_clicked = False
+        else:
+            export_docx_clicked = st.button("📝 DOCX")
 
-    # Single-page "doc"
-    safe_data = normalize_resume(st.session_state.resume_data)
-    html = render_template_html(safe_data, st.session_state.selected_template)
-    
-    # Safety: if HTML is empty, show a tiny diagnostic
-    if not html or not html.strip():
-        st.warning("Template returned empty HTML. Showing raw data for debugging:")
-        st.json(safe_data)
-    else:
-        doc_box = st.container()
-        with doc_box:
-            st.markdown('<span class="doc-anchor"></span>', unsafe_allow_html=True)
-            st.components.v1.html(html, height=1056, scrolling=False)
+    if prefetcher:
+        prefetcher.schedule(st.session_state.session_id, artifact_key, {
+            "pdf": partial(build_pdf, resume, template_name, fit.scale),
+            "docx": partial(build_docx, resume, template_name),
+        })
 
     # Download buttons with proper formatting
-    if export_pdf:
-        # Get name for filename
-        name = st.session_state.resume_data.get("name", "Resume")
-        if name:
-            # Format name for filename: "FirstName_LastName"
-            name_parts = name.split()
-            if len(name_parts) >= 2:
-                filename = f"Resume_{name_parts[0]}_{name_parts[-1]}.pdf"
-            else:
-                filename = f"Resume_{name_parts[0]}.pdf"
+    if export_pdf_clicked:
+        try:
+            with span("export_pdf", template=template_name):
+                pdf_data = build_pdf(resume, template_name, fit.scale)
+        except (PoolBusyError, PDFTimeoutError):
+            st.warning("PDF export is busy right now — please try again in a moment.")
+        except BrokenProcessPool:
+            st.error("PDF export failed for this resume. Try another template or the DOCX export.")
         else:
-            filename = "Resume.pdf"
-        
-        pdf_data = export_pdf_from_html(html)
-        st.download_button("Download PDF", pdf_data, file_name=filename, mime="application/pdf")
+            if prefetcher:
+                prefetcher.put(artifact_key, "pdf", pdf_data)
+            st.download_button("Download PDF", pdf_data, file_name=export_filename(resume.name, "pdf"), mime=PDF_MIME)
     
-    if export_docx:
-        # Get name for filename
-        name = st.session_state.resume_data.get("name", "Resume")
-        if name:
-            # Format name for filename: "FirstName_LastName"
-            name_parts = name.split()
-            if len(name_parts) >= 2:
-                filename = f"Resume_{name_parts[0]}_{name_parts[-1]}.docx"
-            else:
-                filename = f"Resume_{name_parts[0]}.docx"
-        else:
-            filename = "Resume.docx"
-        
-        docx_data = export_docx_from_data(st.session_state.resume_data, st.session_state.selected_template)
-        st.download_button("Download DOCX", docx_data, file_name=filename, mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    if export_docx_clicked:
+        with span("export_docx", template=template_name):
+            docx_data = build_docx(resume, template_name)
+        if prefetcher:
+            prefetcher.put(artifact_key, "docx", docx_data)
+        st.download_button("Download DOCX", docx_data, file_name=export_filename(resume.name, "docx"), mime=DOCX_MIME)
+
+# Title - using st.title instead of custom HTML
+st.title("🤖 AI Resume Builder")
+
+col_left, col_right = st.columns([1,1], gap="small")
+
+# ===== LEFT COLUMN =====
+with col_left:
+    # Anchor the column so CSS can style this real container
+    st.markdown('<span class="left-anchor"></span>', unsafe_allow_html=True)
+    chat_column()
+
+# ===== RIGHT COLUMN =====
+with col_right:
+    # Anchor so CSS styles this real column container
+    st.markdown('<span class="right-anchor"></span>', unsafe_allow_html=True)
+    toolbar_box = st.container()  # filled last, so it reflects a reply streamed below
+    doc_slot = st.empty()
+    render_preview(doc_slot, st.session_state.resume, st.session_state.selected_template,
+                   page_fit(st.session_state.resume, st.session_state.selected_template, st.session_state.auto_fit))
+
+# ===== STREAMED REPLY =====
+# the rest of a reply whose delta reran the app (see stream_reply)
+if "reply_stream" in st.session_state:
+    stream_reply(slots["chat"], doc_slot)
+
+with toolbar_box:
+    toolbar()
+
+# ===== TIMINGS =====
+if SHOW_TIMINGS:
+    with st.expander("⏱️ Timings"):
+        last = st.session_state.get("last_timings")
+        if last is not None:
+            # the previous run is the one that called the LLM when a message was just sent
+            st.caption(f"Previous run {last.run_id}")
+            st.table([{"phase": p, "ms": round(ms, 1)} for p, ms in last.totals().items()])
+        st.caption(f"This run {timings.run_id} (so far)")
+        st.table([{"phase": p, "ms": round(ms, 1)} for p, ms in timings.totals().items()])
+
+persist_state()
+st.session_state.last_timings = timings
+timings.finish()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Headless batch export.
+
+Reads resume JSON documents from a directory (*.json) or a JSONL file, renders each one through
+normalize_resume -> render_template_html -> export_pdf_from_html / export_docx_from_data in a
+process pool, and streams the results into a directory or a .zip archive.
+
+    python batch_export.py resumes.jsonl --out out.zip --formats pdf,docx --workers 8
+"""
+
+import os, re, sys, json, time, zipfile, argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, Tuple, Any
+
+from resume_model import normalize_resume
+from templates import get_available_templates, render_template_html
+from exporters import export_pdf_from_html, export_pdf_from_data, export_docx_from_data, resolve_pdf_engine
+
+STAGES = ("normalize", "render_html", "export_pdf", "export_docx")
+FORMATS = ("html", "pdf", "docx")
+
+def iter_documents(source: str) -> Iterator[Tuple[str, Any]]:
+    """Yields (label, raw document); unparseable documents are yielded as the exception."""
+    if os.path.isdir(source):
+        for fname in sorted(os.listdir(source)):
+            if fname.endswith(".json"):
+                path = os.path.join(source, fname)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        yield os.path.splitext(fname)[0], json.load(f)
+                except Exception as e:
+                    yield os.path.splitext(fname)[0], e
+    else:
+        with open(source, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield f"{n:06d}", json.loads(line)
+                except Exception as e:
+                    yield f"{n:06d}", e
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_")[:60]
+
+def export_one(label: str, doc: Any, template_name: str, formats: Tuple[str, ...], pdf_engine: str) -> Dict[str, Any]:
+    """Worker: run one resume through every stage. Never raises; errors are reported in the result."""
+    result = {"label": label, "outputs": {}, "timings": {}, "error": None}
+    stage = "normalize"
+    try:
+        t0 = time.perf_counter()
+        data = normalize_resume(doc)
+        result["timings"]["normalize"] = time.perf_counter() - t0
+        stem = "_".join(p for p in (label, _slug(data["name"])) if p)
+
+        stage = "render_html"
+        t0 = time.perf_counter()
+        html = render_template_html(data, template_name)
+        result["timings"]["render_html"] = time.perf_counter() - t0
+        if "html" in formats:
+            result["outputs"][f"{stem}.html"] = html.encode("utf-8")
+
+        if "pdf" in formats:
+            stage = "export_pdf"
+            t0 = time.perf_counter()
+            if pdf_engine == "reportlab":
+                pdf = export_pdf_from_data(data, template_name)
+            else:
+                pdf = export_pdf_from_html(render_template_html(data, template_name, inline_css=False), template_name)
+            result["timings"]["export_pdf"] = time.perf_counter() - t0
+            result["outputs"][f"{stem}.pdf"] = pdf
+
+        if "docx" in formats:
+            stage = "export_docx"
+            t0 = time.perf_counter()
+            result["outputs"][f"{stem}.docx"] = export_docx_from_data(data, template_name)
+            result["timings"]["export_docx"] = time.perf_counter() - t0
+    except Exception as e:
+        result["error"] = f"{stage}: {type(e).__name__}: {e}"
+    return result
+
+class OutputSink:
+    """Writes files into a directory, or into a zip archive when the target ends in .zip."""
+    def __init__(self, target: str):
+        self.zip = None
+        if target.endswith(".zip"):
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            self.zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(target, exist_ok=True)
+        self.target = target
+
+    def write(self, name: str, data: bytes):
+        if self.zip is not None:
+            self.zip.writestr(name, data)
+        else:
+            with open(os.path.join(self.target, name), "wb") as f:
+                f.write(data)
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def run_batch(source: str, out: str, template_name: str, formats: Tuple[str, ...], workers: int,
+              pdf_engine: str, progress=sys.stderr) -> Dict[str, Any]:
+    sink = OutputSink(out)
+    timings = {s: [] for s in STAGES}
+    failures, done = [], 0
+    max_inflight = workers * 4  # bounds memory: results are written as they complete
+    start = time.perf_counter()
+
+    def collect(r):
+        nonlocal done
+        done += 1
+        for s, t in r["timings"].items():
+            timings[s].append(t)
+        if r["error"]:
+            failures.append((r["label"], r["error"]))
+            print(f"FAILED {r['label']}: {r['error']}", file=progress)
+        for name, data in r["outputs"].items():
+            sink.write(name, data)
+        if done % 100 == 0:
+            print(f"{done} done, {done / (time.perf_counter() - start):.1f} resumes/s", file=progress)
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = {}  # future -> (label, doc)
+    restarts = 0
+
+    def settle(futures):
+        """Collect finished jobs; returns the (label, doc) of those lost with a dead worker."""
+        lost = []
+        for fut in futures:
+            item = pending.pop(fut)
+            try:
+                r = fut.result()
+            except BrokenProcessPool:
+                lost.append(item)
+            else:
+                collect(r)
+        return lost
+
+    def restart():
+        nonlocal pool, restarts
+        pool.shutdown(wait=False)
+        pool = ProcessPoolExecutor(max_workers=workers)
+        restarts += 1
+
+    def recover(lost):
+        # a worker died (OOM, a crash in native code) and broke the pool: every job in flight failed
+        # with it. Restart the pool and rerun those jobs one at a time, so only the document that
+        # kills its worker is recorded as failed
+        lost += settle(wait(list(pending)).done)
+        restart()
+        for label, doc in lost:
+            try:
+                collect(pool.submit(export_one, label, doc, template_name, formats, pdf_engine).result())
+            except BrokenProcessPool:
+                collect({"label": label, "outputs": {}, "timings": {}, "error": "worker process died"})
+                restart()
+
+    def submit(label, doc):
+        try:
+            fut = pool.submit(export_one, label, doc, template_name, formats, pdf_engine)
+        except BrokenProcessPool:
+            recover([])
+            fut = pool.submit(export_one, label, doc, template_name, formats, pdf_engine)
+        pending[fut] = (label, doc)
+
+    try:
+        for label, doc in iter_documents(source):
+            if isinstance(doc, Exception):
+                collect({"label": label, "outputs": {}, "timings": {}, "error": f"parse: {doc}"})
+                continue
+            if len(pending) >= max_inflight:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                lost = settle(finished)
+                if lost:
+                    recover(lost)
+            submit(label, doc)
+        lost = settle(wait(list(pending)).done)
+        if lost:
+            recover(lost)
+    finally:
+        pool.shutdown()
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "resumes": done,
+        "failed": len(failures),
+        "failures": failures,
+        "pool_restarts": restarts,
+        "elapsed_s": elapsed,
+        "resumes_per_s": done / elapsed if elapsed else 0.0,
+        "stages": {
+            s: {
+                "count": len(v),
+                "total_s": sum(v),
+                "mean_ms": (sum(v) / len(v) * 1000) if v else 0.0,
+                "p50_ms": _percentile(v, 50) * 1000,
+                "p95_ms": _percentile(v, 95) * 1000,
+            }
+            for s, v in timings.items() if v
+        },
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render resume JSON documents to HTML/PDF/DOCX in bulk.")
+    parser.add_argument("source", help="directory of *.json files or a .jsonl file")
+    parser.add_argument("--out", required=True, help="output directory, or a path ending in .zip")
+    parser.add_argument("--template", default="Modern Clean", choices=list(get_available_templates()))
+    parser.add_argument("--formats", default="pdf,docx", help=f"comma-separated subset of {','.join(FORMATS)}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pdf-engine", default=None, choices=("auto", "weasyprint", "reportlab"),
+                        help="defaults to PDF_ENGINE / auto")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    report = run_batch(args.source, args.out, args.template, formats, max(1, args.workers),
+                       resolve_pdf_engine(args.pdf_engine))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['resumes']} resumes in {report['elapsed_s']:.1f}s "
+              f"({report['resumes_per_s']:.1f} resumes/s), {report['failed']} failed")
+        for s, st in report["stages"].items():
+            print(f"  {s:12s} mean {st['mean_ms']:8.1f} ms  p50 {st['p50_ms']:8.1f} ms  "
+                  f"p95 {st['p95_ms']:8.1f} ms  total {st['total_s']:7.1f} s")
+        for label, err in report["failures"]:
+            print(f"  FAILED {label}: {err}")
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the render and export hot paths.
+
+Times normalize_resume, render_template_html (per template), PDF export (WeasyPrint, the
+ReportLab engine and the plain-text fallback), export_docx_from_data and
+ResumeBuilder.generate_pdf/docx/preview on synthetic resumes of several sizes, recording the
+median/min wall time and the peak traced memory of each case.
+
+    python bench.py                              # run and print
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --compare bench_baseline.json --threshold 1.25   # exit 1 on regression
+    python bench.py --stylesheet-cache 20           # PDF: inline <style> vs cached stylesheet
+    python bench.py --output-modes 3 [--fake-llm]   # chat: structured output vs tags
+"""
+
+import sys, json, time, random, argparse, platform, statistics, tracemalloc
+from typing import Callable, Dict, Any, List, Tuple
+
+from resume_model import normalize_resume
+from templates import get_available_templates, render_template_html
+from exporters import (export_pdf_from_html, export_pdf_plaintext, export_pdf_from_data,
+                       export_docx_from_data, weasyprint_available)
+from resume_builder import ResumeBuilder
+
+# --- Synthetic resumes ---
+_WORDS = ("led", "shipped", "designed", "scaled", "reduced", "latency", "revenue", "platform", "mobile",
+          "onboarding", "pipeline", "experiment", "conversion", "team", "roadmap", "API", "dashboard", "users")
+
+def _sentence(rng: random.Random, n: int = 12) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + "."
+
+def make_resume(jobs: int = 3, bullets: int = 4, schools: int = 1, skills_per_category: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """A deterministic resume of the given size."""
+    rng = random.Random(seed)
+    return {
+        "name": "Jordan Example",
+        "title": "Senior Product Designer",
+        "contact": {"email": "jordan@example.com", "phone": "555-010-0000", "location": "Denver, CO",
+                    "linkedin": "linkedin.com/in/jordan", "github": "github.com/jordan"},
+        "summary": " ".join(_sentence(rng) for _ in range(3)),
+        "experience": [
+            {"title": f"Role {i}", "company": f"Company {i}", "location": "Remote",
+             "start_date": f"Jan {2000 + i}", "end_date": f"Dec {2001 + i}",
+             "bullets": [_sentence(rng) for _ in range(bullets)],
+             "technologies": rng.sample(_WORDS, 4)}
+            for i in range(jobs)
+        ],
+        "education": [
+            {"school": f"University {i}", "degree": "B.S. Computer Science", "location": "Boulder, CO",
+             "start_date": "2010", "end_date": "2014", "details": [_sentence(rng, 8)]}
+            for i in range(schools)
+        ],
+        "skills": {k: [f"{k}-skill-{j}" for j in range(skills_per_category)]
+                   for k in ("design", "frontend", "backend", "data_ai", "tools", "other")},
+    }
+
+RESUMES = {
+    "empty": {},
+    "typical": make_resume(),
+    "20x8": make_resume(jobs=20, bullets=8, schools=2),
+    "huge_skills": make_resume(skills_per_category=200),
+}
+
+# --- Runner ---
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    fn()  # warm caches/imports so they don't count against the first sample
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+def cases(include_pdf: bool) -> List[Tuple[str, Callable[[], Any], bool]]:
+    """(name, fn, slow) for every benchmark case; slow cases run fewer repeats."""
+    out = []
+    builder = ResumeBuilder()
+    for size, raw in RESUMES.items():
+        data = normalize_resume(raw)
+        out.append((f"normalize_resume/{size}", lambda raw=raw: normalize_resume(raw), False))
+        for name in get_available_templates():
+            out.append((f"render_template_html/{name}/{size}",
+                        lambda data=data, name=name: render_template_html(data, name), False))
+        name = "Modern Clean"
+        html = render_template_html(data, name)
+        if include_pdf:
+            if weasyprint_available():
+                bare = render_template_html(data, name, inline_css=False)
+                out.append((f"export_pdf_from_html/weasyprint/{size}",
+                            lambda bare=bare, name=name: export_pdf_from_html(bare, name), True))
+            out.append((f"export_pdf_from_html/plaintext_fallback/{size}",
+                        lambda html=html: export_pdf_plaintext(html), True))
+            out.append((f"export_pdf_from_data/reportlab/{size}",
+                        lambda data=data, name=name: export_pdf_from_data(data, name), True))
+            out.append((f"ResumeBuilder.generate_pdf/{size}",
+                        lambda data=data, name=name: builder.generate_pdf(data, name), True))
+        out.append((f"export_docx_from_data/{size}",
+                    lambda data=data, name=name: export_docx_from_data(data, name), True))
+        out.append((f"ResumeBuilder.generate_docx/{size}",
+                    lambda data=data, name=name: builder.generate_docx(data, name), True))
+        out.append((f"ResumeBuilder.generate_preview/{size}",
+                    lambda data=data, name=name: builder.generate_preview(data, name), False))
+    return out
+
+def run(repeat: int, slow_repeat: int, include_pdf: bool, only: str = None) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, fn, slow in cases(include_pdf):
+        if only and only not in name:
+            continue
+        results[name] = measure(fn, slow_repeat if slow else repeat)
+        r = results[name]
+        print(f"{name:60s} {r['median_ms']:9.3f} ms  (min {r['min_ms']:9.3f})  peak {r['peak_kib']:9.1f} KiB",
+              file=sys.stderr)
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cases whose median time or peak memory grew by more than threshold x the baseline."""
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        for metric in ("median_ms", "peak_kib"):
+            # ignore sub-10µs / sub-1KiB noise
+            floor = 0.01 if metric == "median_ms" else 1.0
+            if cur[metric] > max(base[metric], floor) * threshold:
+                regressions.append(f"{name} {metric}: {base[metric]:.3f} -> {cur[metric]:.3f} "
+                                   f"({cur[metric] / max(base[metric], floor):.2f}x)")
+    return regressions
+
+# --- PDF stylesheet cache ---
+def run_stylesheet_cache(runs: int) -> int:
+    """Per-export PDF latency for each template on a typical resume: inline <style> (parsed on
+    every export) vs. the cached stylesheet + shared font configuration, as a Markdown table."""
+    if not weasyprint_available():
+        # the fallback would be timed instead, which says nothing about the stylesheet cache
+        print("WeasyPrint (with its Pango libraries) is required: "
+              "https://doc.courtbouillon.org/weasyprint/stable/first_steps.html", file=sys.stderr)
+        return 1
+    import weasyprint
+    data = normalize_resume(RESUMES["typical"])
+    print(f"WeasyPrint {weasyprint.__version__}, Python {platform.python_version()}, {platform.machine()}, "
+          f"{runs} runs per cell\n")
+    print("| Template | Inline `<style>` (ms) | Cached stylesheet (ms) | Speedup |")
+    print("|---|---:|---:|---:|")
+    for name in get_available_templates():
+        inline = render_template_html(data, name)
+        bare = render_template_html(data, name, inline_css=False)
+        export_pdf_from_html(bare, name)  # warm fonts + stylesheet
+        timings = {}
+        for label, args in (("inline", (inline,)), ("cached", (bare, name))):
+            t0 = time.perf_counter()
+            for _ in range(runs):
+                export_pdf_from_html(*args)
+            timings[label] = (time.perf_counter() - t0) / runs * 1000
+        print(f"| {name} | {timings['inline']:.1f} | {timings['cached']:.1f} | "
+              f"{timings['inline'] / timings['cached']:.2f}x |")
+    return 0
+
+# --- Chat output modes ---
+def compare_output_modes(messages: List[str], rounds: int = 1) -> Dict[str, Dict[str, float]]:
+    """Run the same conversation through both chat output modes (no cache, non-streaming, no
+    local extraction) against the configured API and return parse_stats() for each."""
+    from chat_handler import ChatHandler, parse_stats
+    from resume_merge import merge_delta
+    for mode in ("on", "off"):
+        handler = ChatHandler()
+        handler.cache = None  # every turn has to hit the API to be counted
+        handler.structured_output = mode
+        handler.local_extraction = False
+        for _ in range(rounds):
+            data = {}
+            for msg in messages:
+                _, delta = handler.process_message(msg, data)
+                if delta:
+                    merge_delta(data, delta)
+    return parse_stats()
+
+def run_output_modes(rounds: int, fake_llm: bool) -> int:
+    import os
+    from loadtest import DEFAULT_REPLIES, SCRIPT, FakeLLM
+    llm = None
+    if fake_llm:
+        llm = FakeLLM(DEFAULT_REPLIES, latency=0, token_delay=0, jitter=0).start()
+        os.environ["OPENAI_BASE_URL"], os.environ["OPENAI_API_KEY"] = llm.url, "sk-bench"
+    try:
+        stats = compare_output_modes(SCRIPT, rounds)
+    finally:
+        if llm:
+            llm.stop()
+    print("| output mode | turns | failed parses | mean completion tokens |")
+    print("|---|---|---|---|")
+    for mode, st in stats.items():
+        print(f"| {mode} | {st['turns']} | {st['parse_failures']} ({st['failure_rate']:.1%}) "
+              f"| {st['mean_completion_tokens']:.1f} |")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark render and export hot paths.")
+    parser.add_argument("--repeat", type=int, default=50, help="samples for fast cases")
+    parser.add_argument("--slow-repeat", type=int, default=5, help="samples for export cases")
+    parser.add_argument("--no-pdf", action="store_true", help="skip PDF export cases")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="regression ratio (default 1.25)")
+    parser.add_argument("--stylesheet-cache", type=int, metavar="RUNS",
+                        help="instead: time RUNS PDF exports per template with inline vs cached stylesheets")
+    parser.add_argument("--output-modes", type=int, metavar="ROUNDS",
+                        help="instead: run loadtest's chat script ROUNDS times per chat output mode and "
+                             "print failed parses and completion tokens")
+    parser.add_argument("--fake-llm", action="store_true",
+                        help="with --output-modes: use loadtest's local fake server instead of your API")
+    args = parser.parse_args(argv)
+
+    if args.stylesheet_cache:
+        return run_stylesheet_cache(args.stylesheet_cache)
+    if args.output_modes:
+        return run_output_modes(args.output_modes, args.fake_llm)
+
+    results = run(args.repeat, args.slow_repeat, not args.no_pdf, args.only)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.platform(),
+                       "results": results}, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save_baseline}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,86 @@
-import os, json, re
-from typing import Dict, Tuple, Any
-from openai import OpenAI
+import os, json, re, time, threading, logging
+from typing import Dict, Tuple, Any, Iterator, Optional
+import httpx
+from openai import OpenAI, BadRequestError
+from response_cache import ResponseCache, get_shared_cache
+from telemetry import span, record
+from resume_merge import find_entry, ENTRY_IDENTITY
+import local_extract
+
+MODEL = "gpt-4o-mini"
 
 JSON_TAG_OPEN  = "<RESUME_DATA_JSON>"
 JSON_TAG_CLOSE = "</RESUME_DATA_JSON>"
 
-SYSTEM_PROMPT = f"""
-You are a resume-building assistant. Extract information from user messages and update the resume data.
+# --- Resume schema ---
+# One definition feeds both the schema block of the tag-mode prompt and the JSON schema used for
+# structured output: str is a string field, [str] a list of strings, a dict an object, [dict] a
+# list of objects.
+RESUME_FIELDS = {
+    "name": str,
+    "title": str,
+    "contact": {"email": str, "phone": str, "location": str, "linkedin": str, "github": str},
+    "summary": str,
+    "experience": [{"title": str, "company": str, "location": str, "start_date": str, "end_date": str,
+                    "bullets": [str], "technologies": [str], "index": int, "remove": bool, "replace": bool}],
+    "education": [{"school": str, "degree": str, "location": str, "start_date": str, "end_date": str,
+                   "details": [str], "index": int, "remove": bool, "replace": bool}],
+    "skills": {"design": [str], "frontend": [str], "backend": [str], "data_ai": [str], "tools": [str],
+               "other": [str]},
+}
+
+_SCALARS = {str: ("str", "string"), int: ("int", "integer"), bool: ("bool", "boolean")}
+
+def _schema_text(spec, indent: int = 0) -> str:
+    """The prompt's readable rendering: {"name": str, "bullets": [str, ...], ...}"""
+    pad, end = "  " * (indent + 1), "  " * indent
+    if isinstance(spec, type):
+        return _SCALARS[spec][0]
+    if isinstance(spec, list):
+        if spec[0] is str:
+            return "[str, ...]"
+        return f"[\n{pad}{_schema_text(spec[0], indent + 1)}\n{end}]"
+    items = [f'"{k}": {_schema_text(v, indent + 1)}' for k, v in spec.items()]
+    if indent and all(isinstance(v, type) or v == [str] for v in spec.values()):
+        return f"{{\n{pad}{', '.join(items)}\n{end}}}"
+    return "{\n" + ",\n".join(pad + i for i in items) + f"\n{end}}}"
+
+def _json_schema(spec, nullable: bool = True) -> Dict[str, Any]:
+    """Strict-mode JSON schema: every key is required, so fields the model isn't changing are null."""
+    if isinstance(spec, type):
+        kind = _SCALARS[spec][1]
+        return {"type": [kind, "null"] if nullable else kind}
+    if isinstance(spec, list):
+        schema = {"type": "array", "items": _json_schema(spec[0], nullable=False)}
+    else:
+        schema = {"type": "object", "properties": {k: _json_schema(v) for k, v in spec.items()},
+                  "required": list(spec), "additionalProperties": False}
+    return {"anyOf": [schema, {"type": "null"}]} if nullable else schema
 
-RESPONSE FORMAT:
+REPLY_SCHEMA = {
+    "type": "object",
+    # reply first: the model writes keys in schema order, so the text can stream before the delta
+    "properties": {"reply": {"type": "string"}, "delta": _json_schema(RESUME_FIELDS, nullable=False)},
+    "required": ["reply", "delta"],
+    "additionalProperties": False,
+}
+RESPONSE_FORMAT = {"type": "json_schema", "json_schema": {"name": "resume_reply", "strict": True, "schema": REPLY_SCHEMA}}
+
+TAG_RESPONSE_FORMAT = f"""RESPONSE FORMAT:
 1) Acknowledge what you've added/updated
-2) A JSON object between {JSON_TAG_OPEN} and {JSON_TAG_CLOSE} with only the fields that changed
+2) A JSON object between {JSON_TAG_OPEN} and {JSON_TAG_CLOSE} with only the fields that changed"""
+
+STRUCTURED_RESPONSE_FORMAT = """RESPONSE FORMAT (JSON):
+- "reply": acknowledge what you've added/updated, then ask for what's missing
+- "delta": only the fields that changed; null for every field you are not changing"""
+
+def _system_prompt(response_format: str, schema: bool) -> str:
+    # structured output enforces the schema through the API, so that prompt leaves it out
+    schema_block = f"\nSchema:\n{_schema_text(RESUME_FIELDS)}\n" if schema else ""
+    return f"""
+You are a resume-building assistant. Extract information from user messages and update the resume data.
+
+{response_format}
 
 SIMPLE RULES:
 - Extract ALL information from each message
@@ -22,86 +92,619 @@ SIMPLE RULES:
 - Only ask for what's actually missing
 - Be proactive and drive the conversation forward
 - Don't wait for user to ask "what next?" - suggest next steps
-
-Schema:
-{{
-  "name": str,
-  "title": str,
-  "contact": {{
-    "email": str, "phone": str, "location": str, "linkedin": str, "github": str
-  }},
-  "summary": str,
-  "experience": [
-    {{
-      "title": str,
-      "company": str,
-      "location": str,
-      "start_date": str,
-      "end_date": str,
-      "bullets": [str, ...],
-      "technologies": [str, ...]
-    }}
-  ],
-  "education": [
-    {{
-      "school": str, "degree": str, "location": str,
-      "start_date": str, "end_date": str, "details": [str, ...]
-    }}
-  ],
-  "skills": {{
-    "design": [str, ...],
-    "frontend": [str, ...],
-    "backend": [str, ...],
-    "data_ai": [str, ...],
-    "tools": [str, ...],
-    "other": [str, ...]
-  }}
-}}
-
+{schema_block}
 Guidelines:
 - Extract ALL information from user messages
 - When user gives experience details, extract title, company, dates, bullets, and technologies
 - When user gives contact info, extract email, phone, LinkedIn, GitHub, location
+- Experience/education entries are matched by company+title (school+degree). To correct or delete an
+  existing entry, give its "index" (0-based position in the current resume data) and only the fields
+  that change; add "remove": true to delete it or "replace": true to overwrite it entirely
 - Convert raw text into crisp bullets; prefer action > metric > outcome
 - Keep resume bullets short (<= 1 line each)
 - If information is missing, ask for ONLY the missing pieces
 """
 
-class ChatHandler:
+SYSTEM_PROMPT = _system_prompt(TAG_RESPONSE_FORMAT, schema=True)
+STRUCTURED_SYSTEM_PROMPT = _system_prompt(STRUCTURED_RESPONSE_FORMAT, schema=False)
+
+def parse_tagged(text: str) -> Tuple[str, Dict[str, Any], Optional[str]]:
+    """Split a tag-mode completion into (conversational text, resume delta, problem); problem is
+    None, "missing" (no JSON block) or "invalid" (a block that isn't a JSON object)."""
+    m = re.search(re.escape(JSON_TAG_OPEN) + r"(.*?)" + re.escape(JSON_TAG_CLOSE), text, re.S)
+    if not m:
+        return text.strip(), {}, "missing"
+    try:
+        delta = json.loads(m.group(1).strip())
+    except Exception:
+        delta = None
+    # remove the JSON block from the assistant text
+    text = text.replace(m.group(0), "").strip()
+    if not isinstance(delta, dict):
+        return text, {}, "invalid"
+    return text, delta, None
+
+def split_reply(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Split a full completion into (conversational text, resume delta)."""
+    text, delta, _ = parse_tagged(text)
+    return text, delta
+
+def _drop_nulls(v):
+    # structured output sends null for every field the model isn't changing
+    if isinstance(v, dict):
+        return {k: _drop_nulls(x) for k, x in v.items() if x is not None}
+    if isinstance(v, list):
+        return [_drop_nulls(x) for x in v if x is not None]
+    return v
+
+def parse_structured(content: str) -> Tuple[str, Dict[str, Any], Optional[str]]:
+    """Parse a {"reply": ..., "delta": ...} completion into (text, delta, problem)."""
+    try:
+        obj = json.loads(content)
+    except ValueError:
+        return "", {}, "invalid"
+    if not isinstance(obj, dict) or not isinstance(obj.get("reply"), str):
+        return "", {}, "invalid"
+    delta = _drop_nulls(obj.get("delta") or {})
+    if not isinstance(delta, dict):
+        return obj["reply"].strip(), {}, "invalid"
+    return obj["reply"].strip(), delta, None
+
+class ReplyStreamSplitter:
+    """Incrementally separates streamed text from the RESUME_DATA_JSON block.
+
+    feed() returns (visible_text, delta) where visible_text never contains any part of the
+    JSON block and delta is set only on the chunk where the closing tag arrives.
+    """
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self._buf = ""
+        self._in_json = False
+        self.delta = None
+        self.problem = None  # set like parse_tagged's once the stream is finished
 
-    def process_message(self, user_input: str, current_resume_data: Dict) -> Tuple[str, Dict[str, Any]]:
-        """Returns (assistant_text, resume_delta)"""
+    @staticmethod
+    def _partial_tag_len(buf: str, tag: str) -> int:
+        # length of the longest suffix of buf that is a prefix of tag
+        for k in range(min(len(tag) - 1, len(buf)), 0, -1):
+            if buf.endswith(tag[:k]):
+                return k
+        return 0
+
+    def feed(self, chunk: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        self._buf += chunk
+        out, delta = [], None
+        while self._buf:
+            if not self._in_json:
+                i = self._buf.find(JSON_TAG_OPEN)
+                if i >= 0:
+                    out.append(self._buf[:i])
+                    self._buf = self._buf[i + len(JSON_TAG_OPEN):]
+                    self._in_json = True
+                    continue
+                keep = self._partial_tag_len(self._buf, JSON_TAG_OPEN)
+                out.append(self._buf[:len(self._buf) - keep])
+                self._buf = self._buf[len(self._buf) - keep:]
+                break
+            i = self._buf.find(JSON_TAG_CLOSE)
+            if i < 0:
+                break
+            try:
+                delta = json.loads(self._buf[:i].strip())
+            except Exception:
+                delta = None
+            if not isinstance(delta, dict):
+                delta, self.problem = {}, "invalid"
+            self.delta = delta
+            self._buf = self._buf[i + len(JSON_TAG_CLOSE):]
+            self._in_json = False
+        return "".join(out), delta
+
+    def finish(self) -> str:
+        """Flush any held-back text; an unterminated JSON block is dropped."""
+        rest = "" if self._in_json else self._buf
+        if self.delta is None and self.problem is None:
+            self.problem = "invalid" if self._in_json else "missing"
+        self._buf = ""
+        return rest
+
+_REPLY_START = re.compile(r'\s*\{\s*"reply"\s*:\s*"')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+def _read_json_string(buf: str, i: int) -> Tuple[str, int, bool]:
+    """Decode a JSON string body from buf[i:] as far as it has arrived. Returns (text, next index,
+    closed); an escape sequence cut off by the end of buf is left for the next call."""
+    out = []
+    while i < len(buf):
+        c = buf[i]
+        if c == '"':
+            return "".join(out), i + 1, True
+        if c != "\\":
+            out.append(c)
+            i += 1
+            continue
+        if i + 1 >= len(buf):
+            break
+        if buf[i + 1] != "u":
+            out.append(_ESCAPES.get(buf[i + 1], buf[i + 1]))
+            i += 2
+            continue
+        # \uXXXX, or a \uD8xx\uDCxx surrogate pair that must be decoded together
+        size = 12 if buf[i + 2:i + 4].lower() in ("d8", "d9", "da", "db") else 6
+        if i + size > len(buf):
+            break
+        try:
+            out.append(json.loads(f'"{buf[i:i + size]}"'))
+        except ValueError:
+            out.append(buf[i:i + size])
+        i += size
+    return "".join(out), i, False
+
+class StructuredStreamSplitter:
+    """Streams the "reply" string of a {"reply": ..., "delta": ...} structured completion as it
+    arrives and parses the delta once the whole object is in. Same interface as
+    ReplyStreamSplitter. A stream that turns out not to be JSON (a backend that ignored
+    response_format) is handed to a ReplyStreamSplitter and fell_back is set."""
+    def __init__(self):
+        self._buf = ""
+        self._pos = None  # index of the next undecoded reply character; None until "reply" starts
+        self._reply_done = False
+        self._tags = None
+        self.fell_back = False
+        self.delta = None
+        self.problem = None
+
+    def feed(self, chunk: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if self._tags is not None:
+            return self._tags.feed(chunk)
+        self._buf += chunk
+        if self._pos is None:
+            head = self._buf.lstrip()
+            if head and head[0] != "{":
+                self._tags, self.fell_back = ReplyStreamSplitter(), True
+                return self._tags.feed(self._buf)
+            m = _REPLY_START.match(self._buf)
+            if m is None:
+                return "", None  # too early to tell, or "reply" isn't first: it is read in finish()
+            self._pos = m.end()
+        text = ""
+        if not self._reply_done:
+            text, self._pos, self._reply_done = _read_json_string(self._buf, self._pos)
+        elif self.delta is None and "}" in chunk:
+            _, delta, problem = parse_structured(self._buf)
+            if problem is None:
+                self.delta = delta
+                return text, delta
+        return text, None
+
+    def finish(self) -> str:
+        """Parse whatever hasn't been; returns text that couldn't be streamed earlier."""
+        if self._tags is not None:
+            rest = self._tags.finish()
+            self.delta, self.problem = self._tags.delta, self._tags.problem
+            return rest
+        if self.delta is not None:
+            return ""
+        text, self.delta, self.problem = parse_structured(self._buf)
+        return text if self._pos is None else ""
+
+# --- Compact resume context ---
+# The resume is sent ahead of every user message, so it is serialized without whitespace,
+# with empty fields dropped, and with long lists summarized until it fits the token budget.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1500"))
+
+logger = logging.getLogger(__name__)
+
+_ENCODER = None
+
+def estimate_tokens(text: str) -> int:
+    """Token count via tiktoken when installed, else the usual ~4 chars/token estimate."""
+    global _ENCODER
+    if _ENCODER is None:
         try:
-            # Give AI context about what's already in the resume
-            context = f"Current resume data: {json.dumps(current_resume_data, indent=2)}"
-            
-            msg = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": f"{context}\n\nUser message: {user_input}"},
-            ]
-            rsp = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            import tiktoken
+            _ENCODER = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _ENCODER = False
+    if _ENCODER:
+        return len(_ENCODER.encode(text))
+    return (len(text) + 3) // 4
+
+def _prune_empty(v):
+    if isinstance(v, dict):
+        out = {k: _prune_empty(x) for k, x in v.items()}
+        return {k: x for k, x in out.items() if x not in ("", None, [], {})}
+    if isinstance(v, list):
+        out = [_prune_empty(x) for x in v]
+        # entries stay even when empty: the LLM addresses them by position
+        return [x for x in out if isinstance(x, dict) or x not in ("", None, [], {})]
+    if isinstance(v, str):
+        return v.strip()
+    return v
+
+def _clip_list(entry: dict, field: str, limit: int, hidden: dict, path: tuple):
+    items = entry.get(field)
+    if isinstance(items, list) and len(items) > limit:
+        entry[field] = items[:limit]
+        entry[f"{field}_omitted"] = len(items) - limit
+        hidden[path] = items[limit:]
+
+# list fields the summary levels clip, per entry section
+_CLIPPED_FIELDS = (("experience", ("bullets", "technologies")), ("education", ("details",)))
+
+def _summarize(data: dict, max_items: Optional[int], max_text: Optional[int], hidden: dict) -> dict:
+    if max_items is None and max_text is None:
+        return data
+    out = dict(data)
+    for section, fields in _CLIPPED_FIELDS:
+        if section in out:
+            entries = []
+            for i, e in enumerate(out[section]):
+                e = dict(e)
+                if max_items is not None:
+                    for f in fields:
+                        _clip_list(e, f, max_items, hidden, (section, i, f))
+                entries.append(e)
+            out[section] = entries
+    if max_items is not None and "skills" in out:
+        skills = {}
+        for k, v in out["skills"].items():
+            entry = {k: v}
+            _clip_list(entry, k, max_items * 3, hidden, ("skills", k))
+            skills.update(entry)
+        out["skills"] = skills
+    if max_text is not None and len(out.get("summary", "")) > max_text:
+        out["summary"] = out["summary"][:max_text] + "…"
+    return out
+
+# (max list items, max summary chars) tried in order until the context fits the budget
+_SUMMARY_LEVELS = ((None, None), (6, None), (3, 400), (1, 200), (0, 120))
+
+def compact_resume_context(resume: Dict, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                           hidden: Optional[Dict] = None) -> Tuple[str, int]:
+    """Returns (compact JSON, token count). Falls back to the smallest summary level if
+    nothing fits the budget. Items clipped from lists are put in `hidden` by path, e.g.
+    {("experience", 2, "bullets"): [...]}, for restore_hidden."""
+    data = _prune_empty(resume or {}) or {}
+    for max_items, max_text in _SUMMARY_LEVELS:
+        clipped = {}
+        text = json.dumps(_summarize(data, max_items, max_text, clipped), separators=(",", ":"), ensure_ascii=False)
+        tokens = estimate_tokens(text)
+        if tokens <= token_budget:
+            break
+    if hidden is not None:
+        hidden.update(clipped)
+    return text, tokens
+
+def restore_hidden(delta: Dict[str, Any], resume: Dict, hidden: Dict) -> Dict[str, Any]:
+    """The LLM only saw the first few items of a clipped list, so a list it sends back for that
+    entry would drop the rest when merged. Append the items it never saw to such lists (they go
+    away only with the whole entry)."""
+    if not hidden or not isinstance(delta, dict):
+        return delta
+    out = dict(delta)
+    for section, fields in _CLIPPED_FIELDS:
+        value = out.get(section)
+        if isinstance(value, dict):
+            value = [value]
+        if not isinstance(value, list):
+            continue
+        entries = resume.get(section) if isinstance(resume.get(section), list) else []
+        fixed = []
+        for new in value:
+            i = find_entry(entries, new, ENTRY_IDENTITY[section]) if isinstance(new, dict) else None
+            if i is not None and not new.get("remove"):
+                new = dict(new)
+                for f in fields:
+                    if (section, i, f) in hidden and isinstance(new.get(f), list):
+                        new[f] = new[f] + [x for x in hidden[(section, i, f)] if x not in new[f]]
+            fixed.append(new)
+        out[section] = fixed
+    if isinstance(out.get("skills"), dict):
+        out["skills"] = {k: v + [x for x in hidden[("skills", k)] if x not in v]
+                         if ("skills", k) in hidden and isinstance(v, list) else v
+                         for k, v in out["skills"].items()}
+    return out
+
+# --- Shared LLM client ---
+# One OpenAI client (and one HTTP connection pool) per process, shared by every ChatHandler.
+# The client is thread-safe, so Streamlit's script-runner threads can use it concurrently and
+# new sessions reuse warm keep-alive connections instead of paying fresh TLS handshakes.
+_SHARED_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def _build_client() -> OpenAI:
+    pool_size = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "60")),
+        ),
+        timeout=httpx.Timeout(
+            float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60")),
+            connect=float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5")),
+        ),
+    )
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=http_client,
+        max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+    )
+
+def get_shared_client() -> OpenAI:
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None:
+        with _CLIENT_LOCK:
+            if _SHARED_CLIENT is None:
+                _SHARED_CLIENT = _build_client()
+    return _SHARED_CLIENT
+
+# --- Output mode ---
+# CHAT_STRUCTURED_OUTPUT=auto (default) asks for schema-constrained JSON ({"reply", "delta"}) and,
+# the first time the backend rejects response_format or answers with something that isn't JSON,
+# switches this process back to <RESUME_DATA_JSON> tags. "on" always asks for JSON, "off" always
+# uses tags.
+_STRUCTURED_SUPPORTED = None  # what auto mode has learned about the backend
+
+def _structured_mode() -> str:
+    mode = os.getenv("CHAT_STRUCTURED_OUTPUT", "auto").lower()
+    if mode in ("1", "true", "yes", "on"):
+        return "on"
+    if mode in ("0", "false", "no", "off"):
+        return "off"
+    return "auto"
+
+# --- Parse outcomes ---
+# Per output mode: turns answered by the API, turns whose delta couldn't be read (missing or
+# invalid JSON, refusals) and completion tokens, so the two modes can be compared on real traffic.
+_PARSE_STATS: Dict[str, Dict[str, int]] = {}
+_STATS_LOCK = threading.Lock()
+
+def _count_turn(mode: str, problem: Optional[str], usage: Dict[str, Any]):
+    with _STATS_LOCK:
+        st = _PARSE_STATS.setdefault(mode, {"turns": 0, "parse_failures": 0, "completion_tokens": 0, "turns_with_usage": 0})
+        st["turns"] += 1
+        st["parse_failures"] += problem is not None
+        if "completion_tokens" in usage:
+            st["completion_tokens"] += usage["completion_tokens"]
+            st["turns_with_usage"] += 1
+
+def parse_stats() -> Dict[str, Dict[str, float]]:
+    """{"structured" | "tags": {turns, parse_failures, failure_rate, completion_tokens, mean_completion_tokens}}"""
+    with _STATS_LOCK:
+        return {
+            mode: {**st, "failure_rate": st["parse_failures"] / st["turns"] if st["turns"] else 0.0,
+                   "mean_completion_tokens": st["completion_tokens"] / st["turns_with_usage"] if st["turns_with_usage"] else 0.0}
+            for mode, st in _PARSE_STATS.items()
+        }
+
+class ChatHandler:
+    def __init__(self, client: Optional[OpenAI] = None, cache: Optional[ResponseCache] = None):
+        self.client = client or get_shared_client()
+        # optional on-disk reply cache (CHAT_CACHE_PATH); None means every message hits the API
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.context_token_budget = CONTEXT_TOKEN_BUDGET
+        self._system_tokens = {False: estimate_tokens(SYSTEM_PROMPT), True: estimate_tokens(STRUCTURED_SYSTEM_PROMPT)}
+        self.last_usage = {}
+        self._hidden = {}
+        # CHAT_STREAMING=0 falls back to one blocking completion per message
+        self.streaming = os.getenv("CHAT_STREAMING", "1").lower() not in ("0", "false", "no")
+        self.structured_output = _structured_mode()
+        # CHAT_LOCAL_EXTRACT=0 sends every message to the LLM, contact details included
+        self.local_extraction = os.getenv("CHAT_LOCAL_EXTRACT", "1").lower() not in ("0", "false", "no")
+
+    def _use_structured(self) -> bool:
+        if self.structured_output == "auto":
+            return _STRUCTURED_SUPPORTED is not False
+        return self.structured_output == "on"
+
+    def _structured_unsupported(self, reason):
+        global _STRUCTURED_SUPPORTED
+        if self.structured_output == "auto" and _STRUCTURED_SUPPORTED is not False:
+            _STRUCTURED_SUPPORTED = False
+            logger.warning("backend has no structured output (%s); using %s tags from now on", reason, JSON_TAG_OPEN)
+
+    def _build_messages(self, user_input: str, current_resume_data: Dict, structured: bool = False):
+        """Returns (messages, cache_key); cache_key is None when caching is off."""
+        system_prompt = STRUCTURED_SYSTEM_PROMPT if structured else SYSTEM_PROMPT
+        # Give AI context about what's already in the resume
+        self._hidden = {}  # list items clipped from the context, put back by restore_hidden
+        resume_json, context_tokens = compact_resume_context(current_resume_data, self.context_token_budget,
+                                                             self._hidden)
+        context = ("Current resume data (empty fields omitted; *_omitted counts list items not shown): "
+                   f"{resume_json}")
+        msg = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"{context}\n\nUser message: {user_input}"},
+        ]
+        self.last_usage = {
+            "output": "structured" if structured else "tags",
+            "context_tokens": context_tokens,
+            "prompt_tokens_est": self._system_tokens[structured] + estimate_tokens(msg[1]["content"]),
+        }
+        # the prompt differs per mode, so each mode caches its own replies
+        key = ResponseCache.make_key(MODEL, system_prompt, resume_json, user_input) if self.cache else None
+        return msg, key
+
+    def _create(self, user_input: str, current_resume_data: Dict, msg, key, structured: bool, **kwargs):
+        """Send the completion request. Returns (response, structured, cache_key): in auto mode a
+        backend that rejects response_format is asked again with tags."""
+        try:
+            return self.client.chat.completions.create(
+                model=MODEL,
                 messages=msg,
                 temperature=0.5,
                 max_tokens=700,
-            )
-            text = rsp.choices[0].message.content or ""
+                **({"response_format": RESPONSE_FORMAT} if structured else {}),
+                **kwargs,
+            ), structured, key
+        except BadRequestError as e:
+            if not (structured and self.structured_output == "auto"
+                    and ("response_format" in str(e) or "json_schema" in str(e))):
+                raise
+            self._structured_unsupported(e)
+            msg, key = self._build_messages(user_input, current_resume_data, False)
+            return self._create(user_input, current_resume_data, msg, key, False, **kwargs)
 
-            # split conversational reply and JSON delta
-            delta = {}
-            m = re.search(re.escape(JSON_TAG_OPEN) + r"(.*?)" + re.escape(JSON_TAG_CLOSE), text, re.S)
-            if m:
-                json_str = m.group(1).strip()
-                try:
-                    delta = json.loads(json_str)
-                except Exception:
-                    delta = {}
-                # remove the JSON block from the assistant text
-                text = text.replace(m.group(0), "").strip()
+    def _finish_turn(self, problem: Optional[str]):
+        if problem:
+            self.last_usage["parse_error"] = problem
+            logger.warning("could not read the resume delta (%s, %s)", problem, self.last_usage["output"])
+        _count_turn(self.last_usage["output"], problem, self.last_usage)
+
+    def _cached(self, key):
+        hit = self.cache.get(key) if key else None
+        if hit is not None:
+            self.last_usage["cached"] = True
+            logger.info("chat completion served from cache: %s", self.last_usage)
+        return hit
+
+    def _record_usage(self, usage):
+        if usage is not None:
+            self.last_usage["prompt_tokens"] = usage.prompt_tokens
+            self.last_usage["completion_tokens"] = usage.completion_tokens
+        logger.info("chat completion usage: %s", self.last_usage)
+
+    def _extract_locally(self, user_input: str, current_resume_data: Dict) -> Optional[local_extract.Extraction]:
+        if not self.local_extraction:
+            return None
+        with span("local_extract") as attrs:
+            found = local_extract.extract(user_input, current_resume_data)
+            attrs["result"] = "none" if found is None else "complete" if found.complete else "partial"
+        if found is not None and found.complete:
+            self.last_usage = {"output": "local"}
+            logger.info("chat message answered locally: %s", found.delta)
+        return found
+
+    def process_message(self, user_input: str, current_resume_data: Dict) -> Tuple[str, Dict[str, Any]]:
+        """Returns (assistant_text, resume_delta)"""
+        found = self._extract_locally(user_input, current_resume_data)
+        if found is not None and found.complete:
+            return found.reply, found.delta
+        text, delta = self._llm_message(user_input, current_resume_data)
+        delta = restore_hidden(delta, current_resume_data, self._hidden)
+        if found is not None:
+            # the LLM's reading of the same fields wins; local ones fill what it left out
+            contact = {**found.delta.get("contact", {}), **(delta.get("contact") or {})}
+            delta = {**found.delta, **delta}
+            if contact:
+                delta["contact"] = contact
+        return text, delta
 
+    def _llm_message(self, user_input: str, current_resume_data: Dict) -> Tuple[str, Dict[str, Any]]:
+        try:
+            structured = self._use_structured()
+            with span("llm_context"):
+                msg, key = self._build_messages(user_input, current_resume_data, structured)
+            hit = self._cached(key)
+            if hit is not None:
+                return hit
+            with span("llm_request", streamed=False) as attrs:
+                rsp, structured, key = self._create(user_input, current_resume_data, msg, key, structured)
+                self._record_usage(getattr(rsp, "usage", None))
+                attrs.update(self.last_usage)
+            message = rsp.choices[0].message
+            text = message.content or ""
+
+            # split conversational reply and JSON delta
+            with span("llm_parse") as attrs:
+                if structured and getattr(message, "refusal", None):
+                    text, delta, problem = message.refusal, {}, "refusal"
+                elif structured and text.lstrip().startswith("{"):
+                    text, delta, problem = parse_structured(text)
+                else:
+                    if structured:
+                        self._structured_unsupported("reply was not JSON")
+                        self.last_usage["output"] = "tags"
+                    text, delta, problem = parse_tagged(text)
+                self._finish_turn(problem)
+                attrs["problem"] = problem
+            # a reply whose delta was lost isn't worth replaying from the cache
+            if key and problem is None:
+                self.cache.put(key, text, delta)
             return text, delta
 
         except Exception as e:
-            return f"Sorry—ran into an error parsing that. Could you rephrase? [{e}]", {}
\ No newline at end of file
+            return f"Sorry—ran into an error parsing that. Could you rephrase? [{e}]", {}
+
+    def stream_message(self, user_input: str, current_resume_data: Dict) -> Iterator[Tuple[str, Any]]:
+        """Streams the reply as ("text", chunk) events, with one ("delta", dict) event as soon as
+        the delta is complete. The delta's JSON itself is never yielded as text. Fields extracted
+        locally come first as their own ("delta", dict) event, before the API is called."""
+        found = self._extract_locally(user_input, current_resume_data)
+        if found is not None:
+            yield "delta", found.delta
+            if found.complete:
+                yield "text", found.reply
+                return
+        for kind, payload in self._llm_stream(user_input, current_resume_data):
+            if kind == "delta":
+                payload = restore_hidden(payload, current_resume_data, self._hidden)
+            yield kind, payload
+
+    def _llm_stream(self, user_input: str, current_resume_data: Dict) -> Iterator[Tuple[str, Any]]:
+        try:
+            structured = self._use_structured()
+            with span("llm_context"):
+                msg, key = self._build_messages(user_input, current_resume_data, structured)
+            hit = self._cached(key)
+            if hit is not None:
+                text, delta = hit
+                if delta:
+                    yield "delta", delta
+                yield "text", text
+                return
+            # spans can't wrap a generator body (the caller's work between yields would count),
+            # so time to first token and the whole stream are measured by hand
+            t0 = time.perf_counter()
+            first_token = None
+            stream, structured, key = self._create(user_input, current_resume_data, msg, key, structured,
+                                                   stream=True, stream_options={"include_usage": True})
+            splitter = StructuredStreamSplitter() if structured else ReplyStreamSplitter()
+            usage = None
+            parts = []
+            refused = False
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                piece = chunk.choices[0].delta.content
+                refusal = getattr(chunk.choices[0].delta, "refusal", None)
+                if not (piece or refusal):
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - t0
+                    record("llm_first_token", first_token)
+                if refusal:
+                    # structured output's refusals arrive as plain text outside the JSON
+                    refused = True
+                    parts.append(refusal)
+                    yield "text", refusal
+                    continue
+                text, delta = splitter.feed(piece)
+                if text:
+                    parts.append(text)
+                    yield "text", text
+                if delta is not None:
+                    yield "delta", delta
+            sent = splitter.delta is not None
+            rest = splitter.finish()
+            if rest:
+                parts.append(rest)
+                yield "text", rest
+            if not sent and splitter.delta:
+                # the delta was only complete at the end (one chunk, or "delta" ahead of "reply")
+                yield "delta", splitter.delta
+            if getattr(splitter, "fell_back", False) and not refused:
+                self._structured_unsupported("reply was not JSON")
+                self.last_usage["output"] = "tags"
+            problem = "refusal" if refused else splitter.problem
+            self._record_usage(usage)
+            self._finish_turn(problem)
+            record("llm_request", time.perf_counter() - t0, streamed=True, **self.last_usage)
+            if key and problem is None:
+                self.cache.put(key, "".join(parts).strip(), splitter.delta or {})
+
+        except Exception as e:
+            yield "text", f"Sorry—ran into an error parsing that. Could you rephrase? [{e}]"
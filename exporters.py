@@ -1,64 +1,222 @@
 import io
-from typing import Dict
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
 from docx import Document
 from bs4 import BeautifulSoup
 
+# --- Long-lived WeasyPrint resources ---
+# The font configuration and each template's stylesheet are built once per process (once per
+# worker in pdf_pool) and shared by every export, so an export only has to lay out the content.
+_FONT_CONFIG = None
+_STYLESHEETS = {}  # (template key, scale) -> (css source, weasyprint.CSS)
+_PDF_LOCK = threading.RLock()
+
+def _font_config():
+    global _FONT_CONFIG
+    if _FONT_CONFIG is None:
+        try:
+            from weasyprint.text.fonts import FontConfiguration
+        except ImportError:  # WeasyPrint < 53
+            from weasyprint.fonts import FontConfiguration
+        _FONT_CONFIG = FontConfiguration()
+    return _FONT_CONFIG
+
+def get_pdf_stylesheet(template_name: str, scale: float = 1.0):
+    """Parsed WeasyPrint stylesheet for a template (at an auto-fit scale), parsed once and reused."""
+    from weasyprint import CSS
+    from templates import get_available_templates, scaled_css
+    key = get_available_templates()[template_name]
+    source = scaled_css(key, scale)
+    cached = _STYLESHEETS.get((key, scale))
+    if cached is None or cached[0] != source:
+        with _PDF_LOCK:
+            cached = (source, CSS(string=source, font_config=_font_config()))
+            _STYLESHEETS[(key, scale)] = cached
+    return cached[1]
+
 # --- PDF from HTML using WeasyPrint (best), with graceful fallback ---
-def export_pdf_from_html(html: str) -> bytes:
+def export_pdf_from_html(html: str, template_name: Optional[str] = None, scale: float = 1.0) -> bytes:
+    """Pass template_name with HTML rendered via render_template_html(..., inline_css=False)
+    to use the cached stylesheet instead of re-parsing an inline <style> block. Falls back to a
+    plain-text PDF only when WeasyPrint can't be imported; errors while laying out are raised."""
+    if not weasyprint_available():
+        return export_pdf_plaintext(html)
+    from weasyprint import HTML
+    stylesheets = [get_pdf_stylesheet(template_name, scale)] if template_name else None
+    pdf_io = io.BytesIO()
+    # shared font config: keep in-process exports from using it concurrently
+    with _PDF_LOCK:
+        HTML(string=html).write_pdf(pdf_io, stylesheets=stylesheets, font_config=_font_config())
+    pdf_io.seek(0)
+    return pdf_io.getvalue()
+
+def export_pdf_plaintext(html: str) -> bytes:
+    # ultra-simple fallback: plain text dump (still produces a PDF via reportlab)
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    textobject = c.beginText(36, 750)
+    textobject.setFont("Times-Roman", 11)
+    soup = BeautifulSoup(html, "html.parser")
+    txt = soup.get_text("\n")
+    for line in txt.splitlines():
+        textobject.textLine(line[:95])
+        if textobject.getY() < 36:
+            c.drawText(textobject); c.showPage(); textobject = c.beginText(36, 750); textobject.setFont("Times-Roman", 11)
+    c.drawText(textobject); c.showPage(); c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
+
+# --- PDF engine selection ---
+# "weasyprint" lays out the HTML preview; "reportlab" renders the same templates straight from
+# data (resume_builder.py), which is much faster and needs no native libraries.
+# PDF_ENGINE=auto (default) uses WeasyPrint when it can be imported, otherwise ReportLab.
+PDF_ENGINES = ("weasyprint", "reportlab")
+
+@lru_cache(maxsize=None)
+def weasyprint_available() -> bool:
     try:
-        from weasyprint import HTML
-        pdf_io = io.BytesIO()
-        HTML(string=html).write_pdf(pdf_io)
-        pdf_io.seek(0)
-        return pdf_io.getvalue()
-    except Exception:
-        # ultra-simple fallback: plain text dump (still produces a PDF via reportlab)
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=letter)
-        textobject = c.beginText(36, 750)
-        textobject.setFont("Times-Roman", 11)
-        soup = BeautifulSoup(html, "html.parser")
-        txt = soup.get_text("\n")
-        for line in txt.splitlines():
-            textobject.textLine(line[:95])
-            if textobject.getY() < 36:
-                c.drawText(textobject); c.showPage(); textobject = c.beginText(36, 750); textobject.setFont("Times-Roman", 11)
-        c.drawText(textobject); c.showPage(); c.save()
-        buffer.seek(0)
-        return buffer.getvalue()
+        import weasyprint  # noqa: F401
+        return True
+    except Exception:  # missing package or missing pango/cairo libraries
+        return False
+
+def resolve_pdf_engine(engine: Optional[str] = None) -> str:
+    engine = (engine or os.getenv("PDF_ENGINE", "auto")).lower()
+    if engine in PDF_ENGINES:
+        return engine
+    return "weasyprint" if weasyprint_available() else "reportlab"
+
+def export_pdf_from_data(data: Dict, template_name: str, scale: float = 1.0) -> bytes:
+    from resume_builder import ResumeBuilder
+    return ResumeBuilder().generate_pdf(data, template_name, scale)
+
+# --- Pre-styled DOCX bases ---
+# Each template gets a base document whose named styles (fonts, sizes, colours) are baked in.
+# The base is loaded from DOCX_BASE_DIR/<template key>.docx (shipped in docx_bases/, written by
+# write_docx_bases) once per process and cloned per export, so the exporter only appends text
+# with style references. Bases keep only the styles the exporter uses: python-docx's default
+# template carries ~350 KB of style XML that every clone would parse and every export would
+# ship, plus parts (stylesWithEffects, a thumbnail, customXml) no export refers to.
+DOCX_BASE_DIR = os.getenv("DOCX_BASE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "docx_bases"))
+DOCX_STYLES = ("Normal", "Title", "Heading 1", "List Bullet", "Resume Subtitle", "Resume Contact",
+               "Resume Role", "Resume Meta", "Resume Tech")
+_UNUSED_PARTS = ("/stylesWithEffects", "/thumbnail", "/customXml", "/webSettings")
+
+def _clear_theme_fonts(style):
+    # theme font attributes override w:ascii/w:hAnsi, so drop them for the explicit font to apply
+    from docx.oxml.ns import qn
+    rpr = style.element.rPr
+    if rpr is not None and rpr.rFonts is not None:
+        for attr in ("w:asciiTheme", "w:hAnsiTheme", "w:eastAsiaTheme", "w:cstheme"):
+            rpr.rFonts.attrib.pop(qn(attr), None)
+
+def _prune_docx_base(doc):
+    """Drop every style DOCX_STYLES doesn't need (directly or via basedOn/link/next), the latent
+    style table and the parts no export refers to."""
+    from docx.oxml.ns import qn
+    root = doc.styles.element
+    by_id = {el.get(qn("w:styleId")): el for el in root.findall(qn("w:style"))}
+    todo = [doc.styles[name].style_id for name in DOCX_STYLES]
+    todo += [sid for sid, el in by_id.items() if el.get(qn("w:default")) in ("1", "true")]
+    keep = set()
+    while todo:
+        sid = todo.pop()
+        if sid in keep or sid not in by_id:
+            continue
+        keep.add(sid)
+        for tag in ("w:basedOn", "w:link", "w:next"):
+            ref = by_id[sid].find(qn(tag))
+            if ref is not None:
+                todo.append(ref.get(qn("w:val")))
+    for sid, el in by_id.items():
+        if sid not in keep:
+            root.remove(el)
+    latent = root.find(qn("w:latentStyles"))
+    if latent is not None:
+        root.remove(latent)
+    for rels in (doc.part.rels, doc.part.package.rels):
+        for rid, rel in list(rels.items()):
+            if rel.reltype.endswith(_UNUSED_PARTS):
+                rels.pop(rid)
+
+def build_docx_base(template_key: str) -> bytes:
+    from docx.shared import Pt, RGBColor
+    from docx.enum.style import WD_STYLE_TYPE
+    from templates import TEMPLATE_STYLES
+
+    ts = TEMPLATE_STYLES[template_key]
+    text, muted, accent = (RGBColor.from_string(ts[c].lstrip("#")) for c in ("text_color", "muted_color", "accent_color"))
+    doc = Document()
+    styles = doc.styles
+
+    def define(name, size, bold=None, italic=None, color=None, space_after=None):
+        try:
+            style = styles[name]
+        except KeyError:
+            style = styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+            style.base_style = styles["Normal"]
+            style.quick_style = True
+        style.font.name = ts["docx_font"]
+        _clear_theme_fonts(style)
+        style.font.size = Pt(size)
+        if bold is not None:
+            style.font.bold = bold
+        if italic is not None:
+            style.font.italic = italic
+        if color is not None:
+            style.font.color.rgb = color
+        if space_after is not None:
+            style.paragraph_format.space_after = Pt(space_after)
+
+    define("Normal", 10, color=text)
+    define("Title", 24, bold=True, color=text)
+    define("Heading 1", 10, bold=True, color=accent)
+    define("List Bullet", 10)
+    define("Resume Subtitle", 10, color=muted)
+    define("Resume Contact", 10, color=muted)
+    define("Resume Role", 11, bold=True, space_after=0)
+    define("Resume Meta", 10, italic=True, color=muted)
+    define("Resume Tech", 9, italic=True, color=muted)
+    _prune_docx_base(doc)
+
+    bio = io.BytesIO()
+    doc.save(bio)
+    return bio.getvalue()
+
+@lru_cache(maxsize=None)
+def _docx_base(template_key: str) -> bytes:
+    path = os.path.join(DOCX_BASE_DIR, f"{template_key}.docx")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return build_docx_base(template_key)
+
+def write_docx_bases(directory: str = DOCX_BASE_DIR):
+    """Regenerate the shipped base documents, e.g. after changing a template's fonts or colours."""
+    from templates import TEMPLATE_STYLES
+    os.makedirs(directory, exist_ok=True)
+    for key in TEMPLATE_STYLES:
+        with open(os.path.join(directory, f"{key}.docx"), "wb") as f:
+            f.write(build_docx_base(key))
 
 # --- DOCX builder with proper formatting to match preview ---
 def export_docx_from_data(data: Dict, template_name: str) -> bytes:
-    from docx import Document
-    from docx.shared import Inches, Pt
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from docx.oxml.shared import OxmlElement, qn
-    
-    doc = Document()
-    
-    # Set default font and size
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Inter'
-    font.size = Pt(10)
+    from templates import get_available_templates, TEMPLATE_STYLES
+
+    key = get_available_templates().get(template_name, template_name)
+    headings = TEMPLATE_STYLES[key]["headings"]
+    doc = Document(io.BytesIO(_docx_base(key)))
     
     # Add name as main heading
-    name = data.get("name", "Your Name")
-    heading = doc.add_heading(name, level=0)
-    heading.alignment = WD_ALIGN_PARAGRAPH.LEFT
-    heading_run = heading.runs[0]
-    heading_run.font.size = Pt(24)
-    heading_run.font.bold = True
+    doc.add_paragraph(data.get("name", "Your Name"), style="Title")
     
     # Add title
     if data.get("title"):
-        title_para = doc.add_paragraph(data["title"])
-        title_para.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        title_run = title_para.runs[0]
-        title_run.font.size = Pt(10)
-        title_run.font.color.rgb = None  # Use default color
+        doc.add_paragraph(data["title"], style="Resume Subtitle")
     
     # Add contact info
     contact = data.get("contact", {})
@@ -70,108 +228,61 @@ def export_docx_from_data(data: Dict, template_name: str) -> bytes:
     if contact.get("github"): contact_parts.append(f"GitHub {contact['github']}")
     
     if contact_parts:
-        contact_para = doc.add_paragraph(" | ".join(contact_parts))
-        contact_para.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        contact_run = contact_para.runs[0]
-        contact_run.font.size = Pt(10)
+        doc.add_paragraph(" | ".join(contact_parts), style="Resume Contact")
     
     # Add summary
     if data.get("summary"):
-        doc.add_heading("SUMMARY", level=1)
-        summary_para = doc.add_paragraph(data["summary"])
-        summary_run = summary_para.runs[0]
-        summary_run.font.size = Pt(10)
+        doc.add_paragraph(headings["summary"].upper(), style="Heading 1")
+        doc.add_paragraph(data["summary"])
     
     # Add work experience with proper formatting
     if data.get("experience"):
-        doc.add_heading("WORK EXPERIENCE", level=1)
+        doc.add_paragraph(headings["experience"].upper(), style="Heading 1")
         for job in data["experience"]:
             # Job title and company
             job_header = f"{job.get('title', '')} — {job.get('company', '')}"
             if job.get('location'):
                 job_header += f" | {job['location']}"
-            
-            job_para = doc.add_paragraph()
-            job_run = job_para.add_run(job_header)
-            job_run.font.size = Pt(11)
-            job_run.font.bold = True
+            doc.add_paragraph(job_header, style="Resume Role")
             
             # Dates
             if job.get('start_date') or job.get('end_date'):
-                dates = f"{job.get('start_date', '')} – {job.get('end_date', '')}"
-                date_para = doc.add_paragraph(dates)
-                date_run = date_para.runs[0]
-                date_run.font.size = Pt(10)
-                date_run.font.italic = True
+                doc.add_paragraph(f"{job.get('start_date', '')} – {job.get('end_date', '')}", style="Resume Meta")
             
             # Bullet points
             for bullet in job.get("bullets", []):
-                bullet_para = doc.add_paragraph(bullet, style="List Bullet")
-                bullet_run = bullet_para.runs[0]
-                bullet_run.font.size = Pt(10)
+                doc.add_paragraph(bullet, style="List Bullet")
             
             # Technologies
             if job.get("technologies"):
-                tech_para = doc.add_paragraph(f"Tech: {', '.join(job['technologies'])}")
-                tech_run = tech_para.runs[0]
-                tech_run.font.size = Pt(9)
-                tech_run.font.italic = True
+                doc.add_paragraph(f"Tech: {', '.join(job['technologies'])}", style="Resume Tech")
     
     # Add education
     if data.get("education"):
-        doc.add_heading("EDUCATION", level=1)
+        doc.add_paragraph(headings["education"].upper(), style="Heading 1")
         for edu in data["education"]:
             # Degree and school
-            edu_header = f"{edu.get('degree', '')} — {edu.get('school', '')}"
-            edu_para = doc.add_paragraph()
-            edu_run = edu_para.add_run(edu_header)
-            edu_run.font.size = Pt(11)
-            edu_run.font.bold = True
+            doc.add_paragraph(f"{edu.get('degree', '')} — {edu.get('school', '')}", style="Resume Role")
             
             # Dates and location
             if edu.get('location') or edu.get('start_date') or edu.get('end_date'):
                 location = edu.get('location', '')
                 dates = f"{edu.get('start_date', '')} – {edu.get('end_date', '')}"
-                if location and dates:
-                    meta = f"{location} | {dates}"
-                elif location:
-                    meta = location
-                elif dates:
-                    meta = dates
-                else:
-                    meta = ""
-                
-                if meta:
-                    meta_para = doc.add_paragraph(meta)
-                    meta_run = meta_para.runs[0]
-                    meta_run.font.size = Pt(10)
-                    meta_run.font.italic = True
+                meta = f"{location} | {dates}" if location else dates
+                doc.add_paragraph(meta, style="Resume Meta")
             
             # Details
             for detail in edu.get("details", []):
-                detail_para = doc.add_paragraph(detail, style="List Bullet")
-                detail_run = detail_para.runs[0]
-                detail_run.font.size = Pt(10)
+                doc.add_paragraph(detail, style="List Bullet")
     
     # Add skills
     if data.get("skills"):
-        doc.add_heading("SKILLS", level=1)
+        doc.add_paragraph(headings["skills"].upper(), style="Heading 1")
         for category, skills in data["skills"].items():
             if skills:
-                skill_text = f"{category.replace('_', ' ').title()}: {', '.join(skills)}"
-                skill_para = doc.add_paragraph(skill_text)
-                skill_run = skill_para.runs[0]
-                skill_run.font.size = Pt(10)
-    
-    # Set section heading styles
-    for heading in doc.paragraphs:
-        if heading.style.name.startswith('Heading 1'):
-            heading_run = heading.runs[0]
-            heading_run.font.size = Pt(10)
-            heading_run.font.bold = True
-            heading_run.font.color.rgb = None
+                doc.add_paragraph(f"{category.replace('_', ' ').title()}: {', '.join(skills)}")
     
     bio = io.BytesIO()
     doc.save(bio)
     bio.seek(0)
-    return bio.getvalue()
\ No newline at end of file
+    return bio.getvalue()
@@ -0,0 +1,239 @@
+import os, re
+from html import unescape
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+from xml.sax.saxutils import escape
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from templates import get_available_templates, TEMPLATE_STYLES, SECTIONS
+from resume_builder import _pdf_styles
+
+# --- One-page fit estimate ---
+# Predicts how tall a resume is on a letter page without laying it out: every paragraph the
+# ReportLab engine would emit is reduced to word widths (from the font's AFM metrics, cached per
+# word) and greedily wrapped at the column width, using the same styles (size, leading, spacing,
+# indent) as resume_builder. Measuring is done once per resume; each trial scale is then just
+# arithmetic, so auto_fit_scale can binary-search a zoom that fits one page in a few milliseconds
+# instead of running WeasyPrint (or ReportLab) over and over.
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+FRAME_PADDING = 6  # ReportLab's Frame pads each side of SimpleDocTemplate's margins by 6pt
+# Smallest zoom auto-fit will use; below this the text gets too small to read
+MIN_FIT_SCALE = float(os.getenv("RESUME_FIT_MIN_SCALE", "0.8"))
+
+RULE = "rule"  # pseudo-style for horizontal rules and spacers: (RULE, height)
+
+# Bounded: a long-running server sees every word any user types; the common ones stay cached
+WORD_WIDTH_CACHE_SIZE = 50_000
+
+@lru_cache(maxsize=WORD_WIDTH_CACHE_SIZE)
+def _word_width(word: str, font: str) -> float:
+    """Width of word at 1pt."""
+    return stringWidth(word, font, 1)
+
+def _plain(markup: str) -> List[str]:
+    """Template line markup -> hard lines of visible text."""
+    return [unescape(re.sub(r"<[^>]+>", "", part)) for part in re.split(r"<br\s*/?>", markup)]
+
+def _e(v) -> str:
+    return escape(str(v or ""))
+
+class _Para(NamedTuple):
+    style: str
+    lines: Tuple[Tuple[float, ...], ...]  # per hard line, word widths at 1pt
+
+def _para(style: str, markup: str, font: str) -> _Para:
+    return _Para(style, tuple(tuple(_word_width(w, font) for w in line.split()) for line in _plain(markup)))
+
+def _heading(section, ts, fonts):
+    out = [_para("heading", _e(ts["headings"][section]).upper(), fonts["heading"])]
+    if ts["heading_rule"]:
+        out.append((RULE, 0.75 + 4))
+    return out
+
+# Mirrors resume_builder's _pdf_* builders paragraph for paragraph
+def _header(d, ts, fonts):
+    ph = ts["placeholders"]
+    c = d["contact"]
+    out = [_para("name", _e(d["name"] or ph["name"]), fonts["name"])]
+    for line in ts["header"][1:]:
+        if line == "title":
+            out.append(_para("muted", _e(d["title"] or ph["title"]), fonts["muted"]))
+        elif line == "rule":
+            out.append((RULE, 4 + 0.75 + 6))
+        elif line == "contact":
+            parts = []
+            for f in ts["contact_fields"]:
+                if f == "title":
+                    parts.append(_e(d["title"] or ph["title"]))
+                elif f in ("linkedin", "github"):
+                    if c.get(f):
+                        parts.append(f"{'LinkedIn' if f == 'linkedin' else 'GitHub'} {_e(c[f])}")
+                else:
+                    parts.append(_e(c.get(f) or ph.get(f, "")))
+            out.append(_para("muted", ts["contact_sep"].join(parts), fonts["muted"]))
+    out.append((RULE, 6))
+    return out
+
+def _summary(d, ts, fonts):
+    if not d["summary"]:
+        return []
+    return _heading("summary", ts, fonts) + [_para("body", _e(d["summary"]), fonts["body"])]
+
+def _experience(d, ts, fonts):
+    out = _heading("experience", ts, fonts)
+    if not d["experience"]:
+        return out + [_para("placeholder", _e(ts["placeholders"]["experience"]), fonts["placeholder"])]
+    muted = ts["muted_color"]
+    for x in d["experience"]:
+        loc = ts["experience_location"].format(location=_e(x["location"]), muted=muted) if x["location"] else ""
+        values = dict(title=_e(x["title"]), company=_e(x["company"]), start=_e(x["start_date"]),
+                      end=_e(x["end_date"]), location=loc, muted=muted)
+        out.append(_para("role", ts["experience_line"].format(**values), fonts["role"]))
+        if ts["experience_meta"]:
+            out.append(_para("muted", ts["experience_meta"].format(**values), fonts["muted"]))
+        out += [_para("bullet", _e(b), fonts["bullet"]) for b in x["bullets"]]
+        if ts["show_technologies"] and x["technologies"]:
+            out.append(_para("small", "Tech: " + _e(", ".join(x["technologies"])), fonts["small"]))
+    return out
+
+def _education(d, ts, fonts):
+    out = _heading("education", ts, fonts)
+    if not d["education"]:
+        return out + [_para("placeholder", _e(ts["placeholders"]["education"]), fonts["placeholder"])]
+    muted = ts["muted_color"]
+    for e in d["education"]:
+        loc = ts["education_location"].format(location=_e(e["location"])) if e["location"] else ""
+        values = dict(degree=_e(e["degree"]), school=_e(e["school"]), start=_e(e["start_date"]),
+                      end=_e(e["end_date"]), location=loc, muted=muted)
+        out.append(_para("role", ts["education_line"].format(**values), fonts["role"]))
+        if ts["education_meta"]:
+            out.append(_para("muted", ts["education_meta"].format(**values), fonts["muted"]))
+        if ts["show_details"]:
+            out += [_para("bullet", _e(x), fonts["bullet"]) for x in e["details"]]
+    return out
+
+def _skills(d, ts, fonts):
+    rows = [(k.replace("_", " ").title(), ", ".join(v)) for k, v in d["skills"].items() if v]
+    if not rows:
+        rows = ts["placeholders"]["skills"]
+    return _heading("skills", ts, fonts) + [
+        _para("bullet", f"{_e(label)}: {_e(items)}", fonts["bullet"]) for label, items in rows
+    ]
+
+_SECTION_MEASURES = {
+    "header": _header,
+    "summary": _summary,
+    "experience": _experience,
+    "education": _education,
+    "skills": _skills,
+}
+
+def _lines(words: Tuple[float, ...], space: float, size: float, width: float) -> int:
+    """Greedy word wrap, like ReportLab's Paragraph."""
+    lines, used, space = 1, 0.0, space * size
+    for w in words:
+        w *= size
+        if not used:
+            used = w  # a word wider than the column overflows its line rather than breaking
+        elif used + space + w <= width:
+            used += space + w
+        else:
+            lines += 1
+            used = w
+    return lines
+
+def _height(paras, st, width: float, scale: float, in_cell: bool = False) -> float:
+    """Stacked height of paragraphs. In a frame ReportLab overlaps each spaceBefore with the
+    previous spaceAfter; in a table cell (two-column layouts) spacing simply adds up, minus the
+    first spaceBefore and the last spaceAfter."""
+    height, prev_after, first_before = 0.0, 0.0, None
+    for p in paras:
+        if p[0] == RULE:
+            height += p[1]  # rules and spacers are fixed-size in the ReportLab engine too
+            prev_after = 0.0
+            if first_before is None:
+                first_before = 0.0
+            continue
+        s = st[p.style]
+        size, leading = s.fontSize * scale, s.leading * scale
+        space = _word_width(" ", s.fontName)
+        avail = width - (s.leftIndent + s.rightIndent) * scale
+        lines = sum(_lines(line, space, size, avail) for line in p.lines)
+        before, after = s.spaceBefore * scale, s.spaceAfter * scale
+        if first_before is None:
+            first_before = before
+        height += (before if in_cell else max(before - prev_after, 0)) + lines * leading + after
+        prev_after = after
+    if in_cell and first_before is not None:
+        height -= first_before + prev_after
+    return height
+
+class FitResult(NamedTuple):
+    height: float      # estimated content height, pt
+    available: float   # page height minus margins, pt
+    scale: float
+
+    @property
+    def fits(self) -> bool:
+        return self.height <= self.available
+
+    @property
+    def overflow(self) -> float:
+        """Points of content past the bottom of the page (0 when it fits)."""
+        return max(self.height - self.available, 0.0)
+
+class PageMeasure:
+    """A resume measured for one template; estimate() is cheap enough to call per trial scale."""
+    def __init__(self, data: dict, template_name: str):
+        self.key = get_available_templates().get(template_name, template_name)
+        self.ts = TEMPLATE_STYLES[self.key]
+        self.st = _pdf_styles(self.key)
+        fonts = {name: style.fontName for name, style in self.st.items()}
+        self.sections = {s: _SECTION_MEASURES[s](data, self.ts, fonts) for s in SECTIONS}
+
+    def estimate(self, scale: float = 1.0) -> FitResult:
+        top, side = (m * scale for m in self.ts["margins"])
+        width = PAGE_WIDTH - 2 * (side + FRAME_PADDING)
+        available = PAGE_HEIGHT - 2 * (top + FRAME_PADDING)
+        layout = self.ts["layout"]
+        if "left" in layout:
+            lw, rw = layout["ratio"]
+            # resume_builder sizes the columns from the full doc width, not the padded frame
+            gap = layout["gap"] * scale
+            cols = width + 2 * FRAME_PADDING - gap
+            col = {"left": cols * lw / (lw + rw), "right": cols * rw / (lw + rw)}
+            height = sum(_height(self.sections[s], self.st, width, scale) for s in layout["full"])
+            height += max(
+                _height([p for s in layout[c] for p in self.sections[s]], self.st, col[c], scale, in_cell=True)
+                for c in ("left", "right")
+            )
+        else:
+            height = _height([p for s in SECTIONS for p in self.sections[s]], self.st, width, scale)
+        return FitResult(height, available, scale)
+
+def estimate_fit(data: dict, template_name: str, scale: float = 1.0) -> FitResult:
+    """Estimated height of a normalized resume in the template at the given zoom."""
+    return PageMeasure(data, template_name).estimate(scale)
+
+def auto_fit_scale(data: dict, template_name: str, min_scale: float = MIN_FIT_SCALE,
+                   step: float = 0.01) -> FitResult:
+    """The largest zoom (to `step`, not below min_scale) at which the resume fits one page.
+    Returns the min_scale result when even that overflows."""
+    page = PageMeasure(data, template_name)
+    best = page.estimate(1.0)
+    if best.fits:
+        return best
+    lo, hi = int(round(min_scale / step)), int(round(1.0 / step))  # search in whole steps
+    low = page.estimate(lo * step)
+    if not low.fits:
+        return low
+    best = low
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        r = page.estimate(mid * step)
+        if r.fits:
+            lo, best = mid, r
+        else:
+            hi = mid
+    return best
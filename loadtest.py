@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session load test.
+
+Drives N simulated users through app.py at once, each in its own Streamlit AppTest (the same
+in-process script runner the server uses, one thread per session, minus the browser socket):
+open the page, send scripted chat turns, switch template, export PDF and DOCX. The LLM is a
+local OpenAI-compatible server (streaming and non-streaming chat completions) with configurable
+latency that answers from recorded replies, so runs are free, repeatable and need no network.
+
+For each concurrency level it reports p50/p95/p99 per interaction, throughput and the process
+RSS (at the end of the level and the peak while it ran).
+
+    python loadtest.py --sessions 1,4,16 --turns 4 --llm-latency 0.5 --llm-token-delay 0.02
+    python loadtest.py --sessions 8 --replies recorded.jsonl --json
+
+--replies is a JSONL file of {"match": "text in the user message", "reply": "..."} lines (the
+reply in the app's format, RESUME_DATA_JSON block included); lines without "match" are used in
+turn for any other message.
+"""
+
+import os, sys, json, time, zlib, random, argparse, tempfile, threading
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Any, Optional
+
+from batch_export import _percentile
+from chat_handler import split_reply, estimate_tokens
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+INTERACTIONS = ("load", "chat", "template", "export_pdf", "export_docx")
+
+# --- Scripted conversation ---
+SCRIPT = [
+    "Hi, I'm Jordan Example, a senior backend engineer in Denver. jordan@example.com, 555-010-0000",
+    "I've been a Staff Engineer at Acme since 2019. I led the payments platform rewrite, cut p99 "
+    "latency by 40% and mentored six engineers. Mostly Go, Postgres and Kafka.",
+    "Before that I studied at CU Boulder, BS in Computer Science, 2012 to 2016.",
+    "Skills: Python, Go, Postgres, Kafka, AWS, Terraform, Grafana.",
+]
+
+def _reply(text: str, delta: Dict[str, Any]) -> str:
+    return f"{text}\n<RESUME_DATA_JSON>{json.dumps(delta)}</RESUME_DATA_JSON>"
+
+DEFAULT_REPLIES = [
+    {"match": "Acme", "reply": _reply(
+        "Added your Staff Engineer role at Acme. Where did you study?",
+        {"experience": [{"title": "Staff Engineer", "company": "Acme", "location": "Denver, CO",
+                         "start_date": "2019", "end_date": "Present",
+                         "bullets": ["Led the payments platform rewrite", "Cut p99 latency by 40%",
+                                     "Mentored six engineers"],
+                         "technologies": ["Go", "Postgres", "Kafka"]}]})},
+    {"match": "Boulder", "reply": _reply(
+        "Added your degree from CU Boulder. What are your main skills?",
+        {"education": [{"school": "CU Boulder", "degree": "BS Computer Science", "location": "Boulder, CO",
+                        "start_date": "2012", "end_date": "2016", "details": []}]})},
+    {"match": "Skills", "reply": _reply(
+        "Added your skills. Want me to write a summary?",
+        {"skills": {"backend": ["Python", "Go", "Postgres", "Kafka"], "tools": ["AWS", "Terraform", "Grafana"]},
+         "summary": "Backend engineer who builds fast, reliable payment systems."})},
+    {"reply": _reply(
+        "Got it, Jordan. Tell me about your most recent role.",
+        {"name": "Jordan Example", "title": "Senior Backend Engineer",
+         "contact": {"email": "jordan@example.com", "phone": "555-010-0000", "location": "Denver, CO"}})},
+]
+
+def load_replies(path: str) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# --- Fake OpenAI-compatible server ---
+class FakeLLM:
+    """POST */chat/completions on localhost. Waits `latency` seconds (± jitter) before the first
+    byte, then streams the reply in chunk_chars pieces `token_delay` apart (or sends it whole).
+    A json_schema response_format gets the reply as {"reply", "delta"} JSON unless structured is
+    False, which mimics a backend that ignores response_format."""
+    def __init__(self, replies: List[Dict[str, str]], latency: float = 0.3, token_delay: float = 0.01,
+                 jitter: float = 0.2, chunk_chars: int = 12, structured: bool = True):
+        self.matched = [r for r in replies if r.get("match")]
+        self.fallback = [r for r in replies if not r.get("match")] or replies
+        self.latency, self.token_delay, self.jitter, self.chunk_chars = latency, token_delay, jitter, chunk_chars
+        self.structured = structured
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply_for(self, said: str) -> str:
+        for r in self.matched:
+            if r["match"] in said:
+                return r["reply"]
+        # stable per message (not round-robin) so a session knows which reply to expect
+        return self.fallback[zlib.crc32(said.encode("utf-8")) % len(self.fallback)]["reply"]
+
+    def pick(self, messages: List[Dict[str, str]]) -> str:
+        # only the user's words count: the resume context in front of them repeats earlier answers
+        said = (messages[-1].get("content") or "").rsplit("User message:", 1)[-1].strip() if messages else ""
+        with self._lock:
+            self.requests += 1
+        return self.reply_for(said)
+
+    def _sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def _handler(self):
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, content_type: str, body: Optional[bytes] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if body is None:
+                    self.send_header("Transfer-Encoding", "chunked")
+                else:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body is not None:
+                    self.wfile.write(body)
+
+            def _chunk(self, payload: Dict[str, Any]):
+                data = f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, "application/json", b'{"error":{"message":"not found"}}')
+                    return
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                reply = llm.pick(req.get("messages", []))
+                if llm.structured and (req.get("response_format") or {}).get("type") == "json_schema":
+                    text, delta = split_reply(reply)
+                    reply = json.dumps({"reply": text, "delta": delta})
+                usage = {"prompt_tokens": sum(estimate_tokens(m.get("content") or "") for m in req.get("messages", [])),
+                         "completion_tokens": estimate_tokens(reply)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": req.get("model", "fake")}
+                llm._sleep(llm.latency)
+                if not req.get("stream"):
+                    body = {**base, "object": "chat.completion", "usage": usage, "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}]}
+                    self._send(200, "application/json", json.dumps(body).encode("utf-8"))
+                    return
+                self._send(200, "text/event-stream")
+                chunk = {**base, "object": "chat.completion.chunk"}
+                for i in range(0, len(reply), llm.chunk_chars):
+                    if i:
+                        llm._sleep(llm.token_delay)
+                    self._chunk({**chunk, "choices": [
+                        {"index": 0, "delta": {"content": reply[i:i + llm.chunk_chars]}, "finish_reason": None}]})
+                self._chunk({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if (req.get("stream_options") or {}).get("include_usage"):
+                    self._chunk({**chunk, "choices": [], "usage": usage})
+                data = b"data: [DONE]\n\n"
+                self.wfile.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
+
+# --- Simulated session ---
+class SimulatedSession:
+    """One user: an AppTest of app.py plus a record of how long each interaction took."""
+    def __init__(self, timeout: float):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.samples: List[tuple] = []  # (interaction, seconds, ok)
+
+    def _timed(self, interaction: str, action) -> bool:
+        t0 = time.perf_counter()
+        try:
+            ok = action() is not False and not self.at.exception
+        except Exception:
+            ok = False
+        self.samples.append((interaction, time.perf_counter() - t0, ok))
+        return ok
+
+    def _button(self, label: str):
+        return next((b for b in self.at.button if b.label == label), None)
+
+    def _page_text(self) -> str:
+        return "".join(m.value for m in self.at.markdown)
+
+    def load(self) -> bool:
+        return self._timed("load", self.at.run)
+
+    def chat(self, text: str, expected: str) -> bool:
+        def send():
+            self.at.text_area(key="user_input_text").input(text)
+            self._button("➤").click().run()
+            return escape(expected) in self._page_text()
+        return self._timed("chat", send)
+
+    def switch_template(self) -> bool:
+        box = self.at.selectbox[0]
+        options = list(box.options)
+        following = options[(options.index(box.value) + 1) % len(options)]
+        return self._timed("template", lambda: box.select(following).run())
+
+    def export(self, kind: str) -> Optional[bool]:
+        """Click the export button; None when a prefetched download was already on the page."""
+        button = self._button("📄 PDF" if kind == "pdf" else "📝 DOCX")
+        if button is None:
+            return None
+        label = "Download PDF" if kind == "pdf" else "Download DOCX"
+        return self._timed(f"export_{kind}",
+                           lambda: any(b.label == label for b in button.click().run().get("download_button")))
+
+def allow_concurrent_apptests():
+    """AppTest assumes one run at a time: each run installs a mock Runtime and clears it when it
+    ends, patches config.get_option for the duration and compiles the script into a fresh cache.
+    Concurrent sessions would see another session's clear or un-patch mid-run, so set the option
+    for good, keep answering with the last mock Runtime installed, and share one script cache the
+    way the server does (which also keeps concurrent ast.parse calls off Python 3.11's
+    thread-unsafe recursion check)."""
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    config.set_option("global.appTest", True)
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+            return cls._instance
+        if last:
+            return last[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(last))
+
+def run_session(llm: FakeLLM, turns: int, timeout: float, out: List[tuple], prefetched: List[int]):
+    session = SimulatedSession(timeout)
+    if session.load():
+        for n in range(turns):
+            text = SCRIPT[n % len(SCRIPT)]
+            expected = split_reply(llm.reply_for(text))[0].strip().split("\n")[0][:40]
+            if not session.chat(text, expected):
+                break
+            if n == turns - 1 or n % 2:
+                session.switch_template()
+        for kind in ("pdf", "docx"):
+            if session.export(kind) is None:
+                prefetched[0] += 1
+    out.extend(session.samples)
+
+# --- Measurement ---
+def rss_mb() -> float:
+    """Resident set size of this process (peak RSS where the current value isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+class RSSSampler:
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+def run_level(llm: FakeLLM, sessions: int, turns: int, timeout: float) -> Dict[str, Any]:
+    samples, prefetched = [], [0]
+    threads = [threading.Thread(target=run_session, args=(llm, turns, timeout, samples, prefetched))
+               for _ in range(sessions)]
+    requests_before = llm.requests
+    start = time.perf_counter()
+    with RSSSampler() as rss:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - start
+    by_kind = {}
+    for kind, seconds, ok in samples:
+        by_kind.setdefault(kind, []).append((seconds, ok))
+    return {
+        "sessions": sessions,
+        "elapsed_s": elapsed,
+        "interactions": len(samples),
+        "interactions_per_s": len(samples) / elapsed if elapsed else 0.0,
+        "sessions_per_s": sessions / elapsed if elapsed else 0.0,
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "llm_requests": llm.requests - requests_before,
+        "prefetched_exports": prefetched[0],
+        "rss_mb": rss_mb(),
+        "rss_peak_mb": rss.peak,
+        "interactions_by_kind": {
+            kind: {
+                "count": len(v),
+                "errors": sum(1 for _, ok in v if not ok),
+                "p50_ms": _percentile([s for s, _ in v], 50) * 1000,
+                "p95_ms": _percentile([s for s, _ in v], 95) * 1000,
+                "p99_ms": _percentile([s for s, _ in v], 99) * 1000,
+                "max_ms": max(s for s, _ in v) * 1000,
+            }
+            for kind, v in sorted(by_kind.items(), key=lambda kv: INTERACTIONS.index(kv[0]))
+        },
+    }
+
+def configure_app_env(llm_url: str, prefetch: bool):
+    """Point the app at the fake LLM and keep the run self-contained. Must happen before the first
+    AppTest run: the OpenAI client and the session store are created once per process."""
+    os.environ["OPENAI_BASE_URL"] = llm_url
+    os.environ["OPENAI_API_KEY"] = "sk-loadtest"
+    os.environ.pop("CHAT_CACHE_PATH", None)  # a reply cache would hide the LLM round trip
+    os.environ.setdefault("SESSION_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "sessions.db"))
+    if not prefetch:
+        os.environ["PREFETCH_EXPORTS"] = "0"  # so export clicks measure the export itself
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent simulated sessions.")
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=len(SCRIPT), help="chat turns per session")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds to the first token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="± fraction applied to both delays")
+    parser.add_argument("--replies", metavar="PATH", help="JSONL of recorded replies (default: built-in script)")
+    parser.add_argument("--llm-no-structured", action="store_true",
+                        help="fake a backend without structured output (ignores response_format)")
+    parser.add_argument("--prefetch", action="store_true", help="leave background export prefetching on")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds one script run may take")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    except ValueError:
+        parser.error("--sessions must be comma-separated integers")
+
+    llm = FakeLLM(load_replies(args.replies) if args.replies else DEFAULT_REPLIES, args.llm_latency,
+                  args.llm_token_delay, args.llm_jitter, structured=not args.llm_no_structured).start()
+    configure_app_env(llm.url, args.prefetch)
+    from streamlit import config, logger
+    config.set_option("logger.level", "error")  # per-run deprecation warnings would drown the report
+    logger.set_log_level("error")
+    allow_concurrent_apptests()
+
+    # one unmeasured session first, so imports and template compilation don't count
+    run_session(llm, 1, args.timeout, [], [0])
+    report = {"llm": {"latency_s": args.llm_latency, "token_delay_s": args.llm_token_delay},
+              "baseline_rss_mb": rss_mb(), "levels": []}
+    try:
+        for n in levels:
+            level = run_level(llm, n, args.turns, args.timeout)
+            report["levels"].append(level)
+            if not args.json:
+                print(f"{n:3d} sessions: {level['interactions']} interactions in {level['elapsed_s']:.1f}s "
+                      f"({level['interactions_per_s']:.1f}/s), rss {level['rss_mb']:.0f} MB "
+                      f"(peak {level['rss_peak_mb']:.0f} MB), {level['errors']} errors")
+                for kind, st in level["interactions_by_kind"].items():
+                    print(f"      {kind:12s} n {st['count']:4d}  p50 {st['p50_ms']:8.1f} ms  "
+                          f"p95 {st['p95_ms']:8.1f} ms  p99 {st['p99_ms']:8.1f} ms  max {st['max_ms']:8.1f} ms")
+    finally:
+        llm.stop()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    return 1 if any(level["errors"] for level in report["levels"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import re
+import threading
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+# --- Local contact extraction ---
+# Plenty of chat turns are just "my email is x, phone y, linkedin z". extract() pulls emails,
+# phone numbers, LinkedIn/GitHub URLs, locations and date ranges out of a message with precompiled
+# patterns. When nothing else is left in the message (only filler like "my", "is", "and") the turn
+# is complete: ChatHandler answers it locally with no API call. Otherwise the fields it found are
+# applied straight away and the message still goes to the LLM for the rest.
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+LINKEDIN_RE = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/[\w%-]+/?", re.I)
+GITHUB_RE = re.compile(r"(?:https?://)?(?:www\.)?github\.com/[A-Za-z\d](?:[A-Za-z\d-]*[A-Za-z\d])?/?(?![\w/])", re.I)
+# Phone-shaped only: +country code then groups, North American 3-3-4 (optionally 1- first),
+# a 0 trunk prefix then groups, or 10-15 digits in one run. Arbitrary groups of digits ("order
+# ids 12345 67890 123") are not a phone number; _phone_digits then checks there are 10-15 digits
+PHONE_RE = re.compile(
+    r"(?<![\w/+])(?:\+\d{1,3}(?:[\s.-]?(?:\(\d{1,4}\)|\d{1,4})){2,6}"
+    r"|(?:1[\s.-]?)?(?:\(\d{3}\)\s?|\d{3}[\s.-])\d{3}[\s.-]\d{4}"
+    r"|0\d{1,4}[\s.-]\d{3,4}[\s.-]?\d{3,4}"
+    r"|\d{10,15})(?![\w/])")
+
+_MONTH = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+          r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?")
+_DATE = rf"(?:{_MONTH}\s+(?:19|20)\d{{2}}|\d{{1,2}}/(?:19|20)\d{{2}}|(?:19|20)\d{{2}})"
+DATE_RANGE_RE = re.compile(
+    rf"(?:from\s+)?(?P<start>{_DATE})\s*(?:-|–|—|to|until|till|through|thru)\s*"
+    rf"(?P<end>{_DATE}|present|current|now|today)\b", re.I)
+_ONGOING = {"present", "current", "now", "today"}
+
+# "City, ST" / "City, Country" after a cue ("based in", "location:"); see BARE_LOCATION_RE for none
+_NAME = r"[A-Z][A-Za-z.'-]*(?:\s+[A-Z][A-Za-z.'-]*)*"
+LOCATION_RE = re.compile(
+    rf"(?:\b(?:based|located|living|live|reside|residing)\s+(?:in|out\s+of)|\blocation\s*(?::|is)?)\s+"
+    rf"(?P<place>(?-i:{_NAME})(?:,\s*(?-i:{_NAME}))?|remote)", re.I)
+# without a cue only "City, ST" or "City, Country" counts: any two capitalized phrases would also
+# take "Python, Django" or "Jane Doe, PhD" for a place
+US_STATES = frozenset("""
+AL AK AZ AR CA CO CT DE DC FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH NJ NM NY
+NC ND OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY PR
+""".split())
+COUNTRIES = frozenset("""
+argentina australia austria belgium brazil canada chile china colombia czechia denmark egypt
+england estonia finland france germany ghana greece hungary iceland india indonesia ireland israel
+italy japan kenya latvia lithuania luxembourg malaysia mexico morocco netherlands nigeria norway
+pakistan peru philippines poland portugal romania scotland singapore slovakia spain sweden
+switzerland taiwan thailand turkey uk uae ukraine usa vietnam wales
+""".split()) | {"new zealand", "south africa", "south korea", "united kingdom", "united states"}
+BARE_LOCATION_RE = re.compile(rf"(?P<place>(?P<city>{_NAME}),\s*(?P<region>{_NAME})|[Rr]emote)")
+
+def _bare_place(m: Optional[re.Match]) -> bool:
+    if not m:
+        return False
+    region = m.group("region")
+    return region is None or region in US_STATES or region.lower() in COUNTRIES
+
+# words that can surround the values without meaning anything else
+FILLER = frozenset("""
+a also am and are at be can contact cell dates details e-mail email feel for free github
+handle hello hey hi here i i'm im in info is it it's its linkedin mail me mobile my number ok okay
+on or phone plus please profile reach set sure tel telephone thanks thank that the there this to
+update url use was were with yes you
+""".split())
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z'-]*|\d+")
+
+CONTACT_LABELS = {"email": "email", "phone": "phone number", "linkedin": "LinkedIn", "github": "GitHub",
+                  "location": "location"}
+
+class Extraction(NamedTuple):
+    delta: Dict[str, Any]
+    complete: bool  # nothing left for the LLM
+    reply: str = ""
+
+_STATS = {"handled": 0, "partial": 0, "deferred": 0}
+_STATS_LOCK = threading.Lock()
+
+def stats() -> Dict[str, int]:
+    """Turns answered locally, turns that applied fields locally but still went to the LLM, and
+    turns with nothing to extract."""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+def _take(pattern, text: str, group: Any = 0, keep=None) -> Tuple[List[str], str]:
+    """Matches of pattern (those passing keep) and the text with them blanked out."""
+    found = []
+    def cut(m):
+        value = m.group(group).strip()
+        if keep and not keep(value):
+            return m.group(0)
+        found.append(value)
+        return " "
+    return found, pattern.sub(cut, text)
+
+def _phone_digits(value: str) -> bool:
+    return 10 <= sum(c.isdigit() for c in value) <= 15
+
+def _only_filler(text: str) -> bool:
+    return all(w.lower() in FILLER for w in _WORD_RE.findall(text))
+
+def _date_target(resume: Dict) -> Optional[Tuple[str, Dict]]:
+    """The one entry a bare date range can be about: the last experience or education entry that
+    has no dates yet. Ambiguous (both, or neither) -> None and the LLM decides."""
+    targets = []
+    for section in ("experience", "education"):
+        entries = resume.get(section) or []
+        if entries and isinstance(entries[-1], dict) and not entries[-1].get("start_date"):
+            targets.append((section, entries[-1]))
+    return targets[0] if len(targets) == 1 else None
+
+def _reply(fields: List[str], dated: Optional[Tuple[str, Dict]], resume: Dict) -> str:
+    parts = []
+    if fields:
+        labels = [CONTACT_LABELS[f] for f in fields]
+        listed = labels[0] if len(labels) == 1 else ", ".join(labels[:-1]) + " and " + labels[-1]
+        parts.append(f"Added your {listed}.")
+    if dated:
+        section, entry = dated
+        what = (" at ".join(x for x in (entry.get("title"), entry.get("company")) if x) if section == "experience"
+                else " at ".join(x for x in (entry.get("degree"), entry.get("school")) if x))
+        parts.append(f"Updated the dates for {what or 'that entry'}.")
+    if not resume.get("name"):
+        parts.append("What's your full name?")
+    elif not resume.get("experience"):
+        parts.append("Tell me about your most recent role.")
+    else:
+        parts.append("What would you like to add next?")
+    return " ".join(parts)
+
+def extract(message: str, resume: Dict) -> Optional[Extraction]:
+    """Fields found in the message as a resume delta, or None when there were none."""
+    text = message
+    contact = {}
+    for field, pattern in (("email", EMAIL_RE), ("linkedin", LINKEDIN_RE), ("github", GITHUB_RE)):
+        found, text = _take(pattern, text)
+        if found:
+            contact[field] = found[0].rstrip("/")
+    phones, text = _take(PHONE_RE, text, keep=_phone_digits)
+    if phones:
+        contact["phone"] = phones[0]
+    places, text = _take(LOCATION_RE, text, "place")
+    if places:
+        contact["location"] = places[0].rstrip(".")
+    ranges = [(m.group("start"), m.group("end")) for m in DATE_RANGE_RE.finditer(text)]
+    text = DATE_RANGE_RE.sub(" ", text)
+
+    complete = _only_filler(text)
+    if not complete and "location" not in contact:
+        # "Denver, CO" on its own (plus filler) is most likely a location answer; the LLM still
+        # sees the turn in case it was something else
+        left = _WORD_RE.sub(lambda m: " " if m.group().lower() in FILLER else m.group(), text)
+        bare = BARE_LOCATION_RE.fullmatch(" ".join(left.split()).strip(" .,!"))
+        if _bare_place(bare):
+            contact["location"] = bare.group("place")
+    if contact.get("location", "").lower() == "remote":
+        contact["location"] = "Remote"
+
+    delta: Dict[str, Any] = {"contact": contact} if contact else {}
+    dated = None
+    if ranges and complete and len(ranges) == 1:
+        dated = _date_target(resume)
+        if dated:
+            start, end = ranges[0]
+            section, entry = dated
+            delta[section] = [{"start_date": start,
+                               "end_date": "Present" if end.lower() in _ONGOING else end}]
+    if ranges and not dated:
+        complete = False  # dates for a new or unclear entry: the LLM has the context
+
+    if not delta:
+        with _STATS_LOCK:
+            _STATS["deferred"] += 1
+        return None
+    with _STATS_LOCK:
+        _STATS["handled" if complete else "partial"] += 1
+    return Extraction(delta, complete, _reply(list(contact), dated, resume) if complete else "")
@@ -0,0 +1,234 @@
+import os, sys, time, types, threading
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing.connection import wait
+from concurrent.futures import Future, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from exporters import export_pdf_from_html
+
+# --- Off-thread PDF export ---
+# WeasyPrint layout is CPU-bound and holds the GIL, so running it in the Streamlit script thread
+# freezes that session and serializes concurrent exports. Jobs go to a pool of worker processes
+# that import WeasyPrint once at startup; callers get a Future (or block with a timeout).
+# A job that runs past its timeout can't be cancelled inside WeasyPrint, so its worker is killed
+# and replaced; a worker that dies (OOM, segfault) is replaced the same way.
+
+class PoolBusyError(RuntimeError):
+    """Raised when max_pending jobs are already queued or running."""
+
+def _warm_worker():
+    # pay the WeasyPrint import, font configuration and stylesheet parsing once per worker
+    try:
+        from exporters import get_pdf_stylesheet
+        from templates import get_available_templates
+        for name in get_available_templates():
+            get_pdf_stylesheet(name)
+    except Exception:
+        pass
+
+def _worker_main(conn):
+    _warm_worker()
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        fn, args = job
+        try:
+            result = (True, fn(*args))
+        except Exception as e:
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception as e:  # an unpicklable exception
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+_START_LOCK = threading.Lock()
+
+@contextmanager
+def _bare_main():
+    # spawn re-runs the parent's __main__ in each worker. Under Streamlit that is app.py (the
+    # script runs as a stand-in __main__ module), so every worker would run the whole app; the
+    # workers only need this module, so start them with a bare __main__
+    with _START_LOCK:
+        main = sys.modules.get("__main__")
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        with _bare_main():
+            self.process.start()
+        child.close()
+        self.job = None  # (future, deadline) while busy
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class PDFWorkerPool:
+    def __init__(self, workers: int = 2, max_pending: int = 16, timeout: float = 60.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.recycled = 0  # workers killed for a timeout or replaced after dying
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # spawn, not fork: the parent runs Streamlit's threads and forking those is unsafe
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queue = deque()  # (future, fn, args, timeout) waiting for a free worker
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = self._ctx.Pipe(duplex=False)
+        self._pool = []
+        self._closed = False
+        self._manager = None
+
+    def warm(self):
+        """Start every worker now so the first export doesn't pay process start + imports."""
+        self._ensure_started()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._manager is None:
+                self._pool = [_Worker(self._ctx) for _ in range(self.workers)]
+                self._manager = threading.Thread(target=self._run, name="pdf-pool", daemon=True)
+                self._manager.start()
+
+    def submit(self, html: str, template_name: Optional[str] = None, scale: float = 1.0,
+               timeout: Optional[float] = None) -> Future:
+        """Queue an export. The Future fails with TimeoutError once the job has run for timeout
+        seconds (default self.timeout); its worker is killed and replaced."""
+        if self._closed:
+            raise RuntimeError("PDF pool is shut down")
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusyError(f"{self.max_pending} PDF exports already pending")
+        self._ensure_started()
+        fut = Future()
+        fut.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._queue.append((fut, export_pdf_from_html, (html, template_name, scale),
+                                self.timeout if timeout is None else timeout))
+        self._wake_w.send_bytes(b"")
+        return fut
+
+    def export(self, html: str, template_name: Optional[str] = None, timeout: Optional[float] = None,
+               scale: float = 1.0) -> bytes:
+        """Blocking convenience wrapper; raises TimeoutError after timeout (default self.timeout)."""
+        return self.submit(html, template_name, scale, timeout).result()
+
+    def _run(self):
+        while not self._closed:
+            self._dispatch()
+            busy = [w for w in self._pool if w.job]
+            deadlines = [w.job[1] for w in busy]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            ready = wait([self._wake_r] + [w.conn for w in busy], wait_for)
+            if self._wake_r in ready:
+                while self._wake_r.poll():
+                    self._wake_r.recv_bytes()
+            for w in busy:
+                if w.conn in ready:
+                    self._collect(w)
+                elif time.monotonic() >= w.job[1]:
+                    self._replace(w, TimeoutError("PDF export timed out; its worker was restarted"))
+
+    def _dispatch(self):
+        for w in self._pool:
+            if w.job:
+                continue
+            with self._lock:
+                if not self._queue:
+                    return
+                fut, fn, args, timeout = self._queue.popleft()
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                w.conn.send((fn, args))
+            except (OSError, ValueError) as e:
+                fut.set_exception(BrokenProcessPool(f"PDF worker unavailable: {e}"))
+                self._replace(w, None)
+                continue
+            w.job = (fut, time.monotonic() + timeout)
+
+    def _collect(self, w: _Worker):
+        fut = w.job[0]
+        try:
+            ok, value = w.conn.recv()
+        except (EOFError, OSError):
+            self._replace(w, BrokenProcessPool("PDF worker died during the export"))
+            return
+        w.job = None
+        if ok:
+            fut.set_result(value)
+        else:
+            fut.set_exception(value)
+
+    def _replace(self, w: _Worker, error: Optional[BaseException]):
+        if w.job and error is not None:
+            w.job[0].set_exception(error)
+        w.job = None
+        w.kill()
+        self.recycled += 1
+        if not self._closed:
+            self._pool[self._pool.index(w)] = _Worker(self._ctx)
+
+    def shutdown(self, wait: bool = True):
+        self._closed = True
+        if self._manager is None:
+            return
+        self._wake_w.send_bytes(b"")
+        if wait:
+            self._manager.join()
+        with self._lock:
+            queued, self._queue = list(self._queue), deque()
+        for fut, *_ in queued:
+            fut.cancel()
+        for w in self._pool:
+            if w.job:
+                w.job[0].set_exception(BrokenProcessPool("PDF pool shut down"))
+            try:
+                w.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            w.process.join(timeout=5 if wait else 0)
+            if w.process.is_alive():
+                w.kill()
+
+_SHARED_POOL = None
+_SHARED_LOCK = threading.Lock()
+
+def get_shared_pdf_pool() -> Optional[PDFWorkerPool]:
+    """Process-wide pool configured from PDF_WORKERS / PDF_MAX_PENDING / PDF_JOB_TIMEOUT_SECONDS.
+    PDF_WORKERS=0 disables the pool (exports run in the calling thread)."""
+    global _SHARED_POOL
+    workers = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    if workers <= 0:
+        return None
+    with _SHARED_LOCK:
+        if _SHARED_POOL is None:
+            _SHARED_POOL = PDFWorkerPool(
+                workers=workers,
+                max_pending=int(os.getenv("PDF_MAX_PENDING", str(workers * 4))),
+                timeout=float(os.getenv("PDF_JOB_TIMEOUT_SECONDS", "60")),
+            )
+            _SHARED_POOL.warm()
+        return _SHARED_POOL
+
+def export_pdf(html: str, template_name: Optional[str] = None, timeout: Optional[float] = None,
+               scale: float = 1.0) -> bytes:
+    """Export through the shared pool, or in-process when the pool is disabled. Raises
+    BrokenProcessPool if the worker died on this document: it is not retried in the caller's
+    process, which the crash could take down too."""
+    pool = get_shared_pdf_pool()
+    if pool is None:
+        return export_pdf_from_html(html, template_name, scale)
+    return pool.export(html, template_name, timeout, scale)
@@ -0,0 +1,100 @@
+import os, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+
+# --- Speculative export ---
+# Once a session's resume has been idle for a few seconds, its PDF/DOCX are built in the
+# background and kept under a content key (template + resume), so clicking download serves a
+# ready artifact instead of running an export on the critical path. A new delta cancels the
+# session's pending build and restarts the idle timer. Artifacts are content-addressed and may be
+# shared by other sessions with the same resume, so stale ones are left to age out of the LRU.
+
+class ArtifactPrefetcher:
+    def __init__(self, idle_seconds: float = 3.0, max_artifacts: int = 64, workers: int = 2):
+        self.idle_seconds = idle_seconds
+        self.max_artifacts = max_artifacts
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._artifacts = OrderedDict()  # key -> {fmt: bytes}
+        self._pending = set()            # (key, fmt) being built
+        self._timers = {}                # session id -> Timer
+        self._session_keys = {}          # session id -> key last scheduled
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, fmt: str) -> Optional[bytes]:
+        with self._lock:
+            found = self._artifacts.get(key)
+            if found is None or fmt not in found:
+                return None
+            self._artifacts.move_to_end(key)
+            return found[fmt]
+
+    def put(self, key: Hashable, fmt: str, data: bytes):
+        with self._lock:
+            self._artifacts.setdefault(key, {})[fmt] = data
+            self._artifacts.move_to_end(key)
+            while len(self._artifacts) > self.max_artifacts:
+                self._artifacts.popitem(last=False)
+
+    def schedule(self, session_id: str, key: Hashable, builders: Dict[str, Callable[[], bytes]]):
+        """(Re)start the session's idle timer; when it fires, build any missing artifacts for key."""
+        with self._lock:
+            timer = self._timers.pop(session_id, None)
+            if timer is not None:
+                timer.cancel()
+            self._session_keys[session_id] = key
+            have = self._artifacts.get(key, {})
+            todo = {fmt: fn for fmt, fn in builders.items()
+                    if fmt not in have and (key, fmt) not in self._pending}
+            if not todo:
+                return
+            timer = threading.Timer(self.idle_seconds, self._start, args=(session_id, key, todo))
+            timer.daemon = True
+            self._timers[session_id] = timer
+        timer.start()
+
+    def _start(self, session_id: str, key: Hashable, todo: Dict[str, Callable[[], bytes]]):
+        with self._lock:
+            if self._session_keys.get(session_id) != key:
+                return
+            self._timers.pop(session_id, None)
+            todo = {fmt: fn for fmt, fn in todo.items() if (key, fmt) not in self._pending}
+            self._pending.update((key, fmt) for fmt in todo)
+        for fmt, fn in todo.items():
+            self._executor.submit(self._build, key, fmt, fn)
+
+    def _build(self, key: Hashable, fmt: str, fn: Callable[[], bytes]):
+        try:
+            data = fn()
+        except Exception:
+            data = None  # speculative: the download button falls back to exporting on click
+        with self._lock:
+            self._pending.discard((key, fmt))
+        if data is not None:
+            self.put(key, fmt, data)
+
+    def discard_session(self, session_id: str):
+        """Forget the session's previous resume state: cancel its timer and drop its reference
+        to that key. The artifacts stay for any other session on the same key."""
+        with self._lock:
+            timer = self._timers.pop(session_id, None)
+            if timer is not None:
+                timer.cancel()
+            self._session_keys.pop(session_id, None)
+
+_SHARED = None
+_SHARED_LOCK = threading.Lock()
+
+def get_shared_prefetcher() -> Optional[ArtifactPrefetcher]:
+    """Process-wide prefetcher; PREFETCH_IDLE_SECONDS (default 3) sets the idle delay and
+    PREFETCH_EXPORTS=0 turns speculative export off."""
+    global _SHARED
+    if os.getenv("PREFETCH_EXPORTS", "1").lower() in ("0", "false", "no"):
+        return None
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = ArtifactPrefetcher(
+                idle_seconds=float(os.getenv("PREFETCH_IDLE_SECONDS", "3")),
+                max_artifacts=int(os.getenv("PREFETCH_MAX_ARTIFACTS", "64")),
+            )
+        return _SHARED
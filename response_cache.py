@@ -0,0 +1,100 @@
+import os, json, time, sqlite3, hashlib, threading
+from typing import Dict, Tuple, Any, Optional
+
+# --- On-disk cache of chat completions ---
+# Keyed by a hash of everything that determines the reply (model, system prompt, compacted resume
+# state, user input), so demo scripts, reruns, QA runs and repeated pastes skip the API entirely.
+# Entries expire after ttl_seconds; once max_entries is exceeded the least recently used go first.
+
+class ResponseCache:
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, reply TEXT NOT NULL, delta TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, resume_context: str, user_input: str) -> str:
+        h = hashlib.sha256()
+        # whitespace-insensitive on the user side so re-pasted text still hits
+        for part in (model, system_prompt, resume_context, " ".join(user_input.split())):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT reply, delta, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[2] > self.ttl_seconds:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, reply: str, delta: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, reply, delta, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, reply, json.dumps(delta, separators=(",", ":")), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+_SHARED_CACHE = None
+_SHARED_LOCK = threading.Lock()
+
+def get_shared_cache() -> Optional[ResponseCache]:
+    """Process-wide cache configured from CHAT_CACHE_PATH; None when caching is off (the default)."""
+    global _SHARED_CACHE
+    path = os.getenv("CHAT_CACHE_PATH")
+    if not path:
+        return None
+    with _SHARED_LOCK:
+        if _SHARED_CACHE is None:
+            _SHARED_CACHE = ResponseCache(
+                path,
+                ttl_seconds=float(os.getenv("CHAT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "5000")),
+            )
+        return _SHARED_CACHE
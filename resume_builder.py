@@ -1,15 +1,141 @@
 import io
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict
+from xml.sax.saxutils import escape
 from docx import Document
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus.doctemplate import LayoutError
+from reportlab.platypus.flowables import HRFlowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-from templates import get_template_styles
+from templates import get_available_templates, get_template_styles, TEMPLATE_STYLES, SECTIONS
+from resume_model import normalize_resume
+
+# --- ReportLab PDF engine ---
+# Renders the three HTML templates straight from data using TEMPLATE_STYLES. Paragraph styles
+# are built once per template and reused; this path needs no HTML layout engine at all.
+
+@lru_cache(maxsize=None)
+def _sample_styles():
+    return getSampleStyleSheet()
+
+@lru_cache(maxsize=None)
+def _pdf_styles(key: str, scale: float = 1.0) -> Dict[str, ParagraphStyle]:
+    """Paragraph styles for a template; scale shrinks sizes and spacing for auto-fit (see fit.py)."""
+    ts = TEMPLATE_STYLES[key]
+    text, muted, accent = (colors.HexColor(ts[c]) for c in ("text_color", "muted_color", "accent_color"))
+    k = scale
+    size = ts["body_size"] * k
+    base = ParagraphStyle(f"{key}-body", parent=_sample_styles()["Normal"], fontName=ts["font"],
+                          fontSize=size, leading=size * 1.35, textColor=text)
+    return {
+        "body": base,
+        "name": ParagraphStyle(f"{key}-name", parent=base, fontName=ts["bold_font"], fontSize=ts["name_size"] * k,
+                               leading=ts["name_size"] * k * 1.2, spaceAfter=3 * k),
+        "muted": ParagraphStyle(f"{key}-muted", parent=base, textColor=muted, spaceAfter=2 * k),
+        "heading": ParagraphStyle(f"{key}-heading", parent=base, fontName=ts["bold_font"], fontSize=ts["heading_size"] * k,
+                                  leading=ts["heading_size"] * k * 1.3, textColor=accent, spaceBefore=10 * k, spaceAfter=4 * k),
+        "role": ParagraphStyle(f"{key}-role", parent=base, fontName=ts["role_font"], fontSize=ts["role_size"] * k,
+                               leading=ts["role_size"] * k * 1.3, spaceBefore=3 * k),
+        "bullet": ParagraphStyle(f"{key}-bullet", parent=base, leftIndent=13.5 * k, bulletIndent=4 * k,
+                                 spaceBefore=1 * k, spaceAfter=1 * k),
+        "small": ParagraphStyle(f"{key}-small", parent=base, fontSize=ts["small_size"] * k,
+                                leading=ts["small_size"] * k * 1.35, textColor=muted, spaceAfter=3 * k),
+        "placeholder": ParagraphStyle(f"{key}-placeholder", parent=base, fontName=ts["italic_font"]),
+    }
+
+def _e(v) -> str:
+    return escape(str(v or ""))
+
+def _heading(section, ts, st):
+    out = [Paragraph(_e(ts["headings"][section]).upper(), st["heading"])]
+    if ts["heading_rule"]:
+        out.append(HRFlowable(width="100%", thickness=0.75, color=colors.HexColor(ts["rule_color"]),
+                              spaceBefore=0, spaceAfter=4))
+    return out
+
+def _pdf_header(d, ts, st):
+    ph = ts["placeholders"]
+    c = d["contact"]
+    out = [Paragraph(_e(d["name"] or ph["name"]), st["name"])]
+    for line in ts["header"][1:]:
+        if line == "title":
+            out.append(Paragraph(_e(d["title"] or ph["title"]), st["muted"]))
+        elif line == "rule":
+            out.append(HRFlowable(width="100%", thickness=0.75, color=colors.HexColor(ts["rule_color"]),
+                                  spaceBefore=4, spaceAfter=6))
+        elif line == "contact":
+            parts = []
+            for f in ts["contact_fields"]:
+                if f == "title":
+                    parts.append(_e(d["title"] or ph["title"]))
+                elif f in ("linkedin", "github"):
+                    if c.get(f):
+                        parts.append(f"<b>{'LinkedIn' if f == 'linkedin' else 'GitHub'}</b> {_e(c[f])}")
+                else:
+                    parts.append(_e(c.get(f) or ph.get(f, "")))
+            out.append(Paragraph(ts["contact_sep"].join(parts), st["muted"]))
+    out.append(Spacer(1, 6))
+    return out
+
+def _pdf_summary(d, ts, st):
+    if not d["summary"]:
+        return []
+    return _heading("summary", ts, st) + [Paragraph(_e(d["summary"]), st["body"])]
+
+def _pdf_experience(d, ts, st):
+    out = _heading("experience", ts, st)
+    if not d["experience"]:
+        return out + [Paragraph(_e(ts["placeholders"]["experience"]), st["placeholder"])]
+    muted = ts["muted_color"]
+    for x in d["experience"]:
+        loc = ts["experience_location"].format(location=_e(x["location"]), muted=muted) if x["location"] else ""
+        values = dict(title=_e(x["title"]), company=_e(x["company"]), start=_e(x["start_date"]),
+                      end=_e(x["end_date"]), location=loc, muted=muted)
+        out.append(Paragraph(ts["experience_line"].format(**values), st["role"]))
+        if ts["experience_meta"]:
+            out.append(Paragraph(ts["experience_meta"].format(**values), st["muted"]))
+        out += [Paragraph(_e(b), st["bullet"], bulletText="•") for b in x["bullets"]]
+        if ts["show_technologies"] and x["technologies"]:
+            out.append(Paragraph(f"<b>Tech:</b> {_e(', '.join(x['technologies']))}", st["small"]))
+    return out
+
+def _pdf_education(d, ts, st):
+    out = _heading("education", ts, st)
+    if not d["education"]:
+        return out + [Paragraph(_e(ts["placeholders"]["education"]), st["placeholder"])]
+    muted = ts["muted_color"]
+    for e in d["education"]:
+        loc = ts["education_location"].format(location=_e(e["location"])) if e["location"] else ""
+        values = dict(degree=_e(e["degree"]), school=_e(e["school"]), start=_e(e["start_date"]),
+                      end=_e(e["end_date"]), location=loc, muted=muted)
+        out.append(Paragraph(ts["education_line"].format(**values), st["role"]))
+        if ts["education_meta"]:
+            out.append(Paragraph(ts["education_meta"].format(**values), st["muted"]))
+        if ts["show_details"]:
+            out += [Paragraph(_e(x), st["bullet"], bulletText="•") for x in e["details"]]
+    return out
+
+def _pdf_skills(d, ts, st):
+    rows = [(k.replace("_", " ").title(), ", ".join(v)) for k, v in d["skills"].items() if v]
+    if not rows:
+        rows = ts["placeholders"]["skills"]
+    return _heading("skills", ts, st) + [
+        Paragraph(f"<b>{_e(label)}:</b> {_e(items)}", st["bullet"], bulletText="•") for label, items in rows
+    ]
+
+_SECTION_BUILDERS = {
+    "header": _pdf_header,
+    "summary": _pdf_summary,
+    "experience": _pdf_experience,
+    "education": _pdf_education,
+    "skills": _pdf_skills,
+}
 
 class ResumeBuilder:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
+        self.styles = _sample_styles()
     
     def generate_preview(self, resume_data: Dict, template: str) -> str:
         """Generate plain text preview of resume"""
@@ -124,89 +250,55 @@ TECHNICAL & CREATIVE SKILLS
         
         return resume_text
     
-    def generate_pdf(self, resume_data: Dict, template: str) -> bytes:
-        """Generate PDF resume"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        story = []
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            spaceAfter=6,
-            alignment=1,  # Center
-            textColor=colors.black
-        )
-        
-        header_style = ParagraphStyle(
-            'CustomHeader',
-            parent=self.styles['Heading2'],
-            fontSize=12,
-            spaceAfter=6,
-            spaceBefore=12,
-            textColor=colors.black
-        )
-        
-        # Name
-        story.append(Paragraph(resume_data['name'] or 'Your Name', title_style))
-        
-        # Title
-        if resume_data['title']:
-            story.append(Paragraph(resume_data['title'], self.styles['Normal']))
-        
-        # Contact info
-        contact_parts = []
-        if resume_data['contact']['email']:
-            contact_parts.append(resume_data['contact']['email'])
-        if resume_data['contact']['phone']:
-            contact_parts.append(resume_data['contact']['phone'])
-        if resume_data['contact']['location']:
-            contact_parts.append(resume_data['contact']['location'])
-        
-        if contact_parts:
-            story.append(Paragraph(" | ".join(contact_parts), self.styles['Normal']))
-        
-        story.append(Spacer(1, 12))
-        
-        # Summary
-        if resume_data['summary']:
-            story.append(Paragraph("PROFESSIONAL SUMMARY", header_style))
-            story.append(Paragraph(resume_data['summary'], self.styles['Normal']))
-            story.append(Spacer(1, 12))
-        
-        # Experience
-        if resume_data['experience']:
-            story.append(Paragraph("WORK EXPERIENCE", header_style))
-            for exp in resume_data['experience']:
-                date_range = ""
-                if exp.get('start_date') and exp.get('end_date'):
-                    date_range = f" ({exp['start_date']} - {exp['end_date']})"
-                elif exp.get('start_date'):
-                    date_range = f" ({exp['start_date']} - Present)"
-                
-                story.append(Paragraph(f"{exp.get('title', '')} — {exp.get('company', '')}{date_range}", self.styles['Normal']))
-                if exp.get('description'):
-                    story.append(Paragraph(exp['description'], self.styles['Normal']))
-                story.append(Spacer(1, 6))
-        
-        # Education
-        if resume_data['education']:
-            story.append(Paragraph("EDUCATION", header_style))
-            for edu in resume_data['education']:
-                year_str = f" ({edu.get('year', '')})" if edu.get('year') else ""
-                story.append(Paragraph(f"{edu.get('degree', '')} — {edu.get('school', '')}{year_str}", self.styles['Normal']))
-        
-        # Skills
-        if resume_data['skills']:
-            story.append(Paragraph("SKILLS", header_style))
-            story.append(Paragraph(", ".join(resume_data['skills']), self.styles['Normal']))
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
-    
+    def generate_pdf(self, resume_data: Dict, template: str, scale: float = 1.0) -> bytes:
+        """Generate PDF resume straight from data, laid out like the chosen HTML template
+        (scale < 1 is the auto-fit zoom from fit.auto_fit_scale)"""
+        key = get_available_templates().get(template, template)
+        ts = TEMPLATE_STYLES[key]
+        st = _pdf_styles(key, scale)
+        data = normalize_resume(resume_data)
+        top, side = (m * scale for m in ts["margins"])
+        layout = ts["layout"]
+
+        def build(two_columns: bool) -> bytes:
+            buffer = io.BytesIO()
+            doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=side, leftMargin=side,
+                                    topMargin=top, bottomMargin=top, title=data["name"] or "Resume")
+            story = []
+            if two_columns and "left" in layout:
+                for section in layout["full"]:
+                    story += _SECTION_BUILDERS[section](data, ts, st)
+                left, right = [], []
+                for section in layout["left"]:
+                    left += _SECTION_BUILDERS[section](data, ts, st)
+                for section in layout["right"]:
+                    right += _SECTION_BUILDERS[section](data, ts, st)
+                lw, rw = layout["ratio"]
+                gap = layout["gap"] * scale
+                avail = doc.width - gap  # the gap is the left cell's right padding
+                table = Table([[left, right]],
+                              colWidths=[avail * lw / (lw + rw) + gap, avail * rw / (lw + rw)])
+                table.setStyle(TableStyle([
+                    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+                    ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                    ("RIGHTPADDING", (0, 0), (0, 0), gap),
+                    ("RIGHTPADDING", (1, 0), (1, 0), 0),
+                    ("TOPPADDING", (0, 0), (-1, -1), 0),
+                    ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+                ]))
+                story.append(table)
+            else:
+                for section in SECTIONS:
+                    story += _SECTION_BUILDERS[section](data, ts, st)
+            doc.build(story)
+            return buffer.getvalue()
+
+        try:
+            return build(two_columns=True)
+        except LayoutError:
+            # a column taller than one page can't split inside the table; fall back to one column
+            return build(two_columns=False)
+
     def generate_docx(self, resume_data: Dict, template: str) -> bytes:
         """Generate DOCX resume"""
         doc = Document()
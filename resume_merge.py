@@ -0,0 +1,109 @@
+from typing import Dict, Any, List, Set, Tuple, Optional
+
+# --- Structural delta merge ---
+# The LLM returns only the fields that changed. Instead of replacing whole top-level values,
+# merge_delta updates the resume in place, matching experience/education entries by identity
+# (or an explicit index, which also lets the LLM replace or remove entries),
+# and returns the exact paths that changed, e.g. {("experience", 2, "bullets"), ("skills", "tools")}.
+# An empty result means the delta was a no-op and nothing downstream needs to refresh.
+
+Path = Tuple[Any, ...]
+
+# fields that identify an entry within a list section
+ENTRY_IDENTITY = {
+    "experience": ("company", "title"),
+    "education": ("school", "degree"),
+}
+# keys a delta entry can carry to address entries explicitly; never stored
+#   "index": 0-based position of the entry it edits (lets a correction rename company/title)
+#   "remove": true deletes that entry; "replace": true swaps it for the delta entry wholesale
+ENTRY_CONTROLS = ("index", "remove", "replace")
+
+def _norm(v) -> str:
+    return " ".join(str(v or "").split()).casefold()
+
+def find_entry(entries: List[Dict], new: Dict, identity: Tuple[str, str]) -> Optional[int]:
+    """Index of the existing entry a delta entry is about, or None for a new entry."""
+    if not entries:
+        return None
+    index = new.get("index")
+    if isinstance(index, int) and not isinstance(index, bool) and 0 <= index < len(entries):
+        return index
+    primary, secondary = identity
+    p, s = _norm(new.get(primary)), _norm(new.get(secondary))
+    if not p and not s:
+        # no identity given ("what dates for that role?") -> the entry added most recently
+        return len(entries) - 1
+    candidates = [i for i, e in enumerate(entries)
+                  if (not p or _norm(e.get(primary)) == p) and (not s or _norm(e.get(secondary)) == s)]
+    if candidates:
+        # only one identity field given and several entries share it: the most recent one
+        return candidates[-1]
+    if p and s:
+        # "Sr Engineer" -> "Senior Engineer" at Acme: a renamed entry, not a second role, when the
+        # company has exactly one entry and the delta doesn't date it differently
+        same = [i for i, e in enumerate(entries) if _norm(e.get(primary)) == p]
+        start = _norm(new.get("start_date"))
+        if len(same) == 1 and (not start or start == _norm(entries[same[0]].get("start_date"))):
+            return same[0]
+    return None
+
+def _entries(value) -> List[Dict]:
+    # the LLM sometimes sends one entry as a bare object instead of a one-item list
+    if isinstance(value, dict):
+        value = [value]
+    return [e for e in value if isinstance(e, dict)] if isinstance(value, list) else []
+
+def _merge_fields(target: Dict, new: Dict, path: Path, changed: Set[Path], identity: Tuple[str, ...] = ()):
+    for k, v in new.items():
+        if v is None or k in ENTRY_CONTROLS or target.get(k) == v:
+            continue
+        if k in identity and _norm(target.get(k)) == _norm(v):
+            continue  # same entry, only casing/spacing differs
+        target[k] = v
+        changed.add(path + (k,))
+
+def _merge_entries(resume: Dict, key: str, value, changed: Set[Path]):
+    current = resume.get(key)
+    if not isinstance(current, list):
+        current = resume[key] = []
+    removed = []
+    for new in _entries(value):
+        i = find_entry(current, new, ENTRY_IDENTITY[key])
+        fields = {k: v for k, v in new.items() if k not in ENTRY_CONTROLS and v is not None}
+        if new.get("remove"):
+            if i is not None and i not in removed:
+                removed.append(i)
+        elif i is None:
+            if fields:
+                current.append(fields)
+                changed.add((key, len(current) - 1))
+        elif new.get("replace"):
+            if current[i] != fields:
+                current[i] = fields
+                changed.add((key, i))
+        else:
+            _merge_fields(current[i], fields, (key, i), changed, ENTRY_IDENTITY[key])
+    if removed:
+        # after the other edits, so indexes in the same delta still refer to the entries shown
+        for i in sorted(removed, reverse=True):
+            del current[i]
+        changed.add((key,))
+
+def merge_delta(resume: Dict, delta: Dict) -> Set[Path]:
+    """Deep-merge delta into resume (in place) and return the set of changed paths."""
+    changed: Set[Path] = set()
+    if not isinstance(delta, dict):
+        return changed
+    for key, value in delta.items():
+        if value is None:
+            continue
+        current = resume.get(key)
+        if key in ENTRY_IDENTITY:
+            _merge_entries(resume, key, value, changed)
+        elif isinstance(value, dict) and isinstance(current, dict):
+            _merge_fields(current, value, (key,), changed)
+        elif current != value:
+            resume[key] = value
+            changed.add((key,))
+    return changed
@@ -0,0 +1,139 @@
+from functools import lru_cache
+from typing import Dict, Any, NamedTuple, Tuple
+
+# --- Typed resume model ---
+# Immutable NamedTuples (no per-instance __dict__) validated once by Resume.from_dict when a delta is
+# applied. Being immutable and hashable, one instance can be shared across reruns, sessions and
+# caches; as_dict() converts to the dict shape the Jinja templates and exporters expect and is
+# memoized per instance, so a rerun that didn't change the resume allocates nothing.
+
+CONTACT_FIELDS = ("email", "phone", "location", "linkedin", "github")
+SKILL_CATEGORIES = ("design", "frontend", "backend", "data_ai", "tools", "other")
+
+def _text(v) -> str:
+    return v.strip() if isinstance(v, str) else ("" if v is None else str(v).strip())
+
+def _entries(v) -> tuple:
+    # a list of entries; one bare entry object counts as a one-item list, anything else as none
+    if isinstance(v, dict):
+        return (v,)
+    return tuple(e for e in v if isinstance(e, dict) and e) if isinstance(v, (list, tuple)) else ()
+
+def _texts(v) -> Tuple[str, ...]:
+    if v is None or v == "":
+        return ()
+    if not isinstance(v, (list, tuple)):
+        v = [v]
+    return tuple(t for t in (_text(x) for x in v if x is not None) if t)
+
+class Contact(NamedTuple):
+    email: str = ""
+    phone: str = ""
+    location: str = ""
+    linkedin: str = ""
+    github: str = ""
+
+    @classmethod
+    def from_dict(cls, d) -> "Contact":
+        d = d if isinstance(d, dict) else {}
+        return cls(*(_text(d.get(k)) for k in CONTACT_FIELDS))
+
+class Experience(NamedTuple):
+    title: str = ""
+    company: str = ""
+    location: str = ""
+    start_date: str = ""
+    end_date: str = "Present"
+    bullets: Tuple[str, ...] = ()
+    technologies: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, d) -> "Experience":
+        d = d if isinstance(d, dict) else {}
+        bullets = d.get("bullets")
+        if bullets is None and d.get("description"):
+            bullets = [d["description"]]
+        return cls(
+            title=_text(d.get("title")),
+            company=_text(d.get("company")),
+            location=_text(d.get("location")),
+            start_date=_text(d.get("start_date")),
+            end_date=_text(d.get("end_date")) or "Present",
+            bullets=_texts(bullets),
+            technologies=_texts(d.get("technologies")),
+        )
+
+class Education(NamedTuple):
+    school: str = ""
+    degree: str = ""
+    location: str = ""
+    start_date: str = ""
+    end_date: str = ""
+    details: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, d) -> "Education":
+        d = d if isinstance(d, dict) else {}
+        return cls(
+            school=_text(d.get("school")),
+            degree=_text(d.get("degree")),
+            location=_text(d.get("location")),
+            start_date=_text(d.get("start_date")),
+            end_date=_text(d.get("end_date")),
+            details=_texts(d.get("details")),
+        )
+
+class Resume(NamedTuple):
+    name: str = ""
+    title: str = ""
+    summary: str = ""
+    contact: Contact = Contact()
+    experience: Tuple[Experience, ...] = ()
+    education: Tuple[Education, ...] = ()
+    # (category, items) pairs: the standard categories first, then any extra ones the LLM added
+    skills: Tuple[Tuple[str, Tuple[str, ...]], ...] = tuple((k, ()) for k in SKILL_CATEGORIES)
+
+    @classmethod
+    def from_dict(cls, d) -> "Resume":
+        """Validate a loose resume dict (session state, LLM output, JSON file) into a Resume."""
+        d = d if isinstance(d, dict) else {}
+        skills = d.get("skills") if isinstance(d.get("skills"), dict) else {}
+        extra = tuple(k for k in skills if k not in SKILL_CATEGORIES)
+        return cls(
+            name=_text(d.get("name")),
+            title=_text(d.get("title")),
+            summary=_text(d.get("summary")),
+            contact=Contact.from_dict(d.get("contact")),
+            experience=tuple(Experience.from_dict(e) for e in _entries(d.get("experience"))),
+            education=tuple(Education.from_dict(e) for e in _entries(d.get("education"))),
+            skills=tuple((k, _texts(skills.get(k))) for k in SKILL_CATEGORIES + extra),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Template/exporter dict shape. Memoized and shared: treat the result as read-only."""
+        return _as_dict(self)
+
+@lru_cache(maxsize=1024)
+def _as_dict(resume: Resume) -> Dict[str, Any]:
+    return to_plain_dict(resume)
+
+def to_plain_dict(resume: Resume) -> Dict[str, Any]:
+    """A fresh, mutable dict for the resume."""
+    return {
+        "name": resume.name,
+        "title": resume.title,
+        "summary": resume.summary,
+        "contact": resume.contact._asdict(),
+        "experience": [
+            dict(e._asdict(), bullets=list(e.bullets), technologies=list(e.technologies))
+            for e in resume.experience
+        ],
+        "education": [dict(e._asdict(), details=list(e.details)) for e in resume.education],
+        "skills": {k: list(v) for k, v in resume.skills},
+    }
+
+EMPTY_RESUME = Resume()
+
+def normalize_resume(d) -> Dict[str, Any]:
+    """Ensure all keys exist and types are what templates expect."""
+    return to_plain_dict(Resume.from_dict(d))
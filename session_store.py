@@ -0,0 +1,141 @@
+import os, json, time, zlib, sqlite3, threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# --- Persistent session state ---
+# A session's resume data, transcript and template choice are written through to a backing store
+# (SQLite by default) whenever they change, as zlib-compressed compact JSON. Only the most
+# recently used sessions stay in memory; app.py drops its copy from st.session_state at the end
+# of each run and reloads from here, so an idle tab costs a row on disk rather than RAM, and a
+# reconnect (same ?sid= URL) or a server restart picks the conversation up where it left off.
+# The sid is the only key to a stored session, personal details included: anyone with the URL
+# can open it, so treat it like a password (don't share or log it).
+
+def encode_state(state: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), 6)
+
+def decode_state(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+class SessionStore(ABC):
+    """Hot in-memory LRU over a backing store. Subclasses implement _read/_write/_delete."""
+    def __init__(self, hot_sessions: int = 200):
+        self.hot_sessions = hot_sessions
+        self.hits = 0
+        self.misses = 0
+        self._hot = OrderedDict()  # session id -> state dict (shared with the running script)
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._hot.get(session_id)
+            if state is not None:
+                self._hot.move_to_end(session_id)
+                self.hits += 1
+                return state
+            self.misses += 1
+        blob = self._read(session_id)
+        if blob is None:
+            return None
+        try:
+            state = decode_state(blob)
+        except (ValueError, zlib.error):
+            return None  # unreadable row: start the session fresh rather than fail the page
+        self._remember(session_id, state)
+        return state
+
+    def save(self, session_id: str, state: Dict[str, Any], dirty: bool = True):
+        """Keep state hot; write it to the backing store only when it changed (dirty). Keys
+        starting with "_" (e.g. derived objects) are kept in memory only."""
+        self._remember(session_id, state)
+        if dirty:
+            self._write(session_id, encode_state({k: v for k, v in state.items() if not k.startswith("_")}))
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._hot.pop(session_id, None)
+        self._delete(session_id)
+
+    def _remember(self, session_id: str, state: Dict[str, Any]):
+        with self._lock:
+            self._hot[session_id] = state
+            self._hot.move_to_end(session_id)
+            while len(self._hot) > self.hot_sessions:
+                self._hot.popitem(last=False)  # already on disk: every change is written through
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hot": len(self._hot), "hot_sessions": self.hot_sessions, "hits": self.hits, "misses": self.misses}
+
+    @abstractmethod
+    def _read(self, session_id: str) -> Optional[bytes]:
+        """The stored blob, or None when there is none (or it expired)."""
+
+    @abstractmethod
+    def _write(self, session_id: str, blob: bytes):
+        """Insert or replace the session's blob."""
+
+    @abstractmethod
+    def _delete(self, session_id: str):
+        """Remove the session's blob, if any."""
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path: str, hot_sessions: int = 200, ttl_seconds: float = 30 * 24 * 3600):
+        super().__init__(hot_sessions)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, state BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+
+    def _read(self, session_id: str) -> Optional[bytes]:
+        with self._db_lock:
+            row = self._db.execute("SELECT state, updated FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def _write(self, session_id: str, blob: bytes):
+        now = time.time()
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO sessions (id, state, updated) VALUES (?, ?, ?)",
+                             (session_id, blob, now))
+            self._db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl_seconds,))
+
+    def _delete(self, session_id: str):
+        with self._db_lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def stats(self) -> dict:
+        out = super().stats()
+        with self._db_lock:
+            out["stored"] = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return out
+
+_SHARED_STORE = None
+_SHARED_LOCK = threading.Lock()
+
+def get_session_store() -> Optional[SessionStore]:
+    """Process-wide store configured from SESSION_STORE (sqlite | off), SESSION_DB_PATH,
+    SESSION_HOT_SESSIONS and SESSION_TTL_DAYS. None when off (state stays in st.session_state)."""
+    global _SHARED_STORE
+    kind = os.getenv("SESSION_STORE", "sqlite").lower()
+    if kind in ("off", "none", "0"):
+        return None
+    if kind != "sqlite":
+        raise ValueError(f"unknown SESSION_STORE {kind!r} (expected sqlite or off)")
+    with _SHARED_LOCK:
+        if _SHARED_STORE is None:
+            _SHARED_STORE = SQLiteSessionStore(
+                os.getenv("SESSION_DB_PATH", "sessions.db"),
+                hot_sessions=int(os.getenv("SESSION_HOT_SESSIONS", "200")),
+                ttl_seconds=float(os.getenv("SESSION_TTL_DAYS", "30")) * 24 * 3600,
+            )
+        return _SHARED_STORE
@@ -0,0 +1,156 @@
+import os, json, time, uuid, threading, contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+# --- Per-rerun phase timings ---
+# Each Streamlit script run opens a RunTimings; span() anywhere below it (app.py phases,
+# ChatHandler's LLM call) appends (phase, duration) to that run through a context variable, so
+# nothing has to be threaded through function signatures. When the run finishes its spans are
+# written as one batch: JSONL lines to RESUME_TIMINGS_LOG and process-wide per-phase totals to a
+# Prometheus text file at RESUME_METRICS_FILE. Both are off when unset; a span is two
+# perf_counter() calls and a list append, so it is fine to leave on.
+
+# Histogram bucket bounds (seconds) for the Prometheus file
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_CURRENT = contextvars.ContextVar("resume_run_timings", default=None)
+
+class RunTimings:
+    def __init__(self, session_id: str = "", scope: str = "app"):
+        self.session_id = session_id
+        self.scope = scope  # "app" for a full script run, "fragment" for a fragment's own rerun
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.finished = False
+
+    def record(self, phase: str, seconds: float, **attrs):
+        self.spans.append({"phase": phase, "duration_ms": round(seconds * 1000, 3), **attrs})
+
+    def totals(self) -> Dict[str, float]:
+        """Milliseconds per phase (repeated phases are summed), in first-seen order."""
+        out = {}
+        for s in self.spans:
+            out[s["phase"]] = out.get(s["phase"], 0.0) + s["duration_ms"]
+        return out
+
+    def finish(self):
+        """Record the whole run as the "script" phase and flush to the sinks. Idempotent."""
+        if self.finished:
+            return
+        self.finished = True
+        self.record("script", time.perf_counter() - self._t0)
+        if _CURRENT.get() is self:
+            _CURRENT.set(None)
+        get_sink().write(self)
+
+def start_run(session_id: str = "", scope: str = "app") -> RunTimings:
+    run = RunTimings(session_id, scope)
+    _CURRENT.set(run)
+    return run
+
+def current_run() -> Optional[RunTimings]:
+    return _CURRENT.get()
+
+@contextmanager
+def span(phase: str, **attrs):
+    """Time the block into the current run (no-op outside a run). Yields the attrs dict so the
+    block can add details, e.g. payload size or cache hit."""
+    run = _CURRENT.get()
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        if run is not None:
+            run.record(phase, time.perf_counter() - t0, **attrs)
+
+def record(phase: str, seconds: float, **attrs):
+    """Add an already-measured span to the current run (for durations a with-block can't wrap,
+    like time to first streamed token)."""
+    run = _CURRENT.get()
+    if run is not None:
+        run.record(phase, seconds, **attrs)
+
+# --- Sinks ---
+class TimingSink:
+    def __init__(self, log_path: Optional[str] = None, metrics_path: Optional[str] = None,
+                 metrics_interval: float = 10.0):
+        self.log_path = log_path
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self._hist: Dict[str, List[float]] = {}  # phase -> [bucket counts..., +Inf count, sum]
+        self._last_metrics = 0.0
+        self._lock = threading.Lock()
+
+    def write(self, run: RunTimings):
+        if not (self.log_path or self.metrics_path):
+            return
+        with self._lock:
+            if self.log_path:
+                lines = "".join(
+                    json.dumps({"ts": round(run.started, 3), "session_id": run.session_id, "run_id": run.run_id,
+                                "scope": run.scope, **s},
+                               default=str) + "\n"
+                    for s in run.spans
+                )
+                try:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(lines)
+                except OSError:
+                    pass  # timings must never break the app
+            if self.metrics_path:
+                for s in run.spans:
+                    self._observe(s["phase"], s["duration_ms"] / 1000)
+                now = time.monotonic()
+                if now - self._last_metrics >= self.metrics_interval:
+                    self._last_metrics = now
+                    self._write_metrics()
+
+    def _observe(self, phase: str, seconds: float):
+        h = self._hist.get(phase)
+        if h is None:
+            h = self._hist[phase] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+        h[len(BUCKETS)] += 1
+        h[-1] += seconds
+
+    def metrics_text(self) -> str:
+        lines = ["# HELP resume_phase_seconds Time spent per app phase.",
+                 "# TYPE resume_phase_seconds histogram"]
+        for phase in sorted(self._hist):
+            h = self._hist[phase]
+            for bound, count in zip(BUCKETS, h):
+                lines.append(f'resume_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+            lines.append(f'resume_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {h[len(BUCKETS)]}')
+            lines.append(f'resume_phase_seconds_sum{{phase="{phase}"}} {h[-1]:.6f}')
+            lines.append(f'resume_phase_seconds_count{{phase="{phase}"}} {h[len(BUCKETS)]}')
+        return "\n".join(lines) + "\n"
+
+    def _write_metrics(self):
+        # write-then-rename so a scraper (node_exporter textfile collector) never sees a partial file
+        tmp = f"{self.metrics_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.metrics_text())
+            os.replace(tmp, self.metrics_path)
+        except OSError:
+            pass
+
+_SINK = None
+_SINK_LOCK = threading.Lock()
+
+def get_sink() -> TimingSink:
+    """Process-wide sink configured from RESUME_TIMINGS_LOG / RESUME_METRICS_FILE /
+    RESUME_METRICS_INTERVAL_SECONDS."""
+    global _SINK
+    with _SINK_LOCK:
+        if _SINK is None:
+            _SINK = TimingSink(
+                log_path=os.getenv("RESUME_TIMINGS_LOG") or None,
+                metrics_path=os.getenv("RESUME_METRICS_FILE") or None,
+                metrics_interval=float(os.getenv("RESUME_METRICS_INTERVAL_SECONDS", "10")),
+            )
+        return _SINK
@@ -1,4 +1,12 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from jinja2 import Environment, BaseLoader
+from markupsafe import Markup
 
 def get_available_templates():
     return {
@@ -8,14 +16,23 @@ def get_available_templates():
     }
 
 # --- Jinja2 templates (kept inline for simplicity). Use semantic tags for fidelity. ---
-TEMPLATES = {}
+# Each template is a page layout plus per-section render units. Sections only see the resume
+# fields listed in SECTION_FIELDS, so their output can be cached and reused independently:
+# a delta that touches only `skills` re-renders only the skills block.
+SECTIONS = ("header", "summary", "experience", "education", "skills")
+SECTION_FIELDS = {
+    "header": ("name", "title", "contact"),
+    "summary": ("summary",),
+    "experience": ("experience",),
+    "education": ("education",),
+    "skills": ("skills",),
+}
 
-TEMPLATES["modern_clean"] = r"""
-<!doctype html>
-<html>
-<head>
-<meta charset="utf-8">
-<style>
+# Per-template stylesheets, kept apart from the markup so PDF export can parse each one once
+# (see exporters.export_pdf_from_html) while the preview still inlines it.
+TEMPLATE_CSS = {}
+
+TEMPLATE_CSS["modern_clean"] = r"""
   :root { --text:#1f2937; --muted:#6b7280; --accent:#111827; }
           body { margin:0; font-family: Inter, -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; color: var(--text); font-size: 11px; background: #fff; }
           .page { padding: 36px 44px; background: #fff; }
@@ -24,15 +41,142 @@ TEMPLATES["modern_clean"] = r"""
           .contact { font-size: 11px; color: var(--muted); margin-bottom: 14px; }
           h2 { font-size: 11px; letter-spacing: .6px; text-transform: uppercase; color: var(--accent); margin: 18px 0 8px; border-bottom: 1px solid #e5e7eb; padding-bottom:4px;}
           .role { font-weight:600; font-size: 12px; }
-          .meta { color: var(--muted); font-size: 11px; }l
+          .meta { color: var(--muted); font-size: 11px; }
   ul { margin: 6px 0 8px 18px; }
   li { margin: 2px 0; }
   .cols { display:grid; grid-template-columns: 2fr 1fr; gap: 24px; }
   small { color: var(--muted); }
-</style>
+"""
+
+TEMPLATE_CSS["classic_serif"] = r"""
+          body { margin:0; font-family: "Georgia", "Times New Roman", serif; color:#222; font-size: 11px; }
+          .page { padding: 42px 50px; }
+          h1 { margin:0 0 4px; font-size:28px; font-weight:700; letter-spacing:.2px; }
+          .rule { height:1px; background:#000; margin:8px 0 12px; }
+          .muted { color:#555; font-size:11px; }
+          h2 { font-size:12px; margin: 14px 0 6px; text-transform:uppercase; letter-spacing:.6px; }
+          li { margin: 3px 0; }
+"""
+
+TEMPLATE_CSS["compact_two_col"] = r"""
+          body { margin:0; font-family: "Inter", system-ui, -apple-system; color:#222; font-size: 11px; }
+          .page { padding: 28px 32px; }
+          .grid { display:grid; grid-template-columns: 1fr 1fr; gap: 18px; }
+          h1 { margin:0; font-size:24px; font-weight:800; }
+          .muted { color:#666; font-size:11px; margin-bottom:6px; }
+          h2 { font-size:11px; margin: 12px 0 6px; text-transform:uppercase; letter-spacing:.6px; }
+          ul { margin:6px 0 8px 18px; }
+"""
+
+# --- Style metadata for non-HTML renderers (ReportLab PDF in resume_builder.py, DOCX bases in exporters.py) ---
+# Mirrors TEMPLATE_CSS in points (1px = 0.75pt) together with each HTML template's layout,
+# headings, line formats and placeholder text, so data-driven renderers reproduce the preview.
+# Line formats use {muted} for the muted colour and receive already-escaped values.
+TEMPLATE_STYLES = {
+    "modern_clean": {
+        "font": "Helvetica", "bold_font": "Helvetica-Bold", "italic_font": "Helvetica-Oblique", "docx_font": "Inter",
+        "text_color": "#1f2937", "muted_color": "#6b7280", "accent_color": "#111827", "rule_color": "#e5e7eb",
+        "body_size": 8.25, "name_size": 19.5, "role_font": "Helvetica-Bold", "role_size": 9, "heading_size": 8.25, "small_size": 7.5,
+        "margins": (27, 33),  # (top/bottom, left/right)
+        "heading_rule": True,
+        "layout": {"full": ("header", "summary"), "left": ("experience",), "right": ("education", "skills"),
+                   "ratio": (2, 1), "gap": 18},
+        "header": ("name", "title", "contact"),
+        "contact_fields": ("email", "phone", "location", "linkedin", "github"), "contact_sep": " | ",
+        "headings": {"summary": "Summary", "experience": "Work Experience", "education": "Education", "skills": "Skills"},
+        "experience_line": "{title} — {company}{location}", "experience_location": " <font color=\"{muted}\">| {location}</font>",
+        "experience_meta": "{start} – {end}", "show_technologies": True,
+        "education_line": "{degree} — {school}", "education_meta": "{location}{start} – {end}", "education_location": "{location} | ",
+        "show_details": True,
+        "placeholders": {
+            "name": "Lorem Ipsum", "title": "Product Designer | UX Strategist | Creative Technologist",
+            "email": "lorem@ipsum.com", "phone": "555-555-5555", "location": "Lorem City, LC",
+            "experience": "Lorem ipsum placeholder experience with crisp bullets and dates.",
+            "education": "Lorem ipsum education block.",
+            "skills": (("Design", "Wireframing, Prototyping"), ("Frontend", "React, SwiftUI"), ("Backend", "Python, Flask")),
+        },
+    },
+    "classic_serif": {
+        "font": "Times-Roman", "bold_font": "Times-Bold", "italic_font": "Times-Italic", "docx_font": "Georgia",
+        "text_color": "#222222", "muted_color": "#555555", "accent_color": "#222222", "rule_color": "#000000",
+        "body_size": 8.25, "name_size": 21, "role_font": "Times-Roman", "role_size": 8.25, "heading_size": 9, "small_size": 7.5,
+        "margins": (31.5, 37.5),
+        "heading_rule": False,
+        "layout": {"full": ("header", "summary", "experience", "education", "skills")},
+        "header": ("name", "contact", "rule", "title"),
+        "contact_fields": ("email", "phone", "location"), "contact_sep": " | ",
+        "headings": {"summary": "Professional Summary", "experience": "Work Experience", "education": "Education",
+                     "skills": "Certifications, Skills & Interests"},
+        "experience_line": "<b>{title}</b>, {company} <font color=\"{muted}\">— {start} – {end}</font>",
+        "experience_location": "", "experience_meta": None, "show_technologies": False,
+        "education_line": "<b>{degree}</b>, {school} <font color=\"{muted}\">— {start} – {end}</font>",
+        "education_meta": None, "education_location": "", "show_details": False,
+        "placeholders": {
+            "name": "J. McJobface", "title": "Product Designer | UX Strategist | Creative Technologist",
+            "email": "hey@sheetstresumee.com", "phone": "(555) 555-5555", "location": "Denver, CO",
+            "experience": "Experience placeholder…", "education": "Education placeholder…",
+            "skills": (("Skills", "Lorem ipsum dolor sit amet…"),),
+        },
+    },
+    "compact_two_col": {
+        "font": "Helvetica", "bold_font": "Helvetica-Bold", "italic_font": "Helvetica-Oblique", "docx_font": "Inter",
+        "text_color": "#222222", "muted_color": "#666666", "accent_color": "#222222", "rule_color": "#000000",
+        "body_size": 8.25, "name_size": 18, "role_font": "Helvetica", "role_size": 8.25, "heading_size": 8.25, "small_size": 7.5,
+        "margins": (21, 24),
+        "heading_rule": False,
+        "layout": {"full": ("header",), "left": ("experience",), "right": ("summary", "education", "skills"),
+                   "ratio": (1, 1), "gap": 13.5},
+        "header": ("name", "contact"),
+        "contact_fields": ("title", "email", "phone"), "contact_sep": " • ",
+        "headings": {"summary": "Summary", "experience": "Experience", "education": "Education", "skills": "Skills"},
+        "experience_line": "<b>{title}</b> — {company}<br/><font color=\"{muted}\">{start} – {end}{location}</font>",
+        "experience_location": " • {location}", "experience_meta": None, "show_technologies": False,
+        "education_line": "<b>{degree}</b>, {school}<br/><font color=\"{muted}\">{start} – {end}</font>",
+        "education_meta": None, "education_location": "", "show_details": False,
+        "placeholders": {
+            "name": "Lorem Ipsum", "title": "Creative Technologist",
+            "email": "lorem@ipsum.com", "phone": "555-555-5555", "location": "",
+            "experience": "Experience placeholder…", "education": "Education placeholder…",
+            "skills": (),
+        },
+    },
+}
+
+def get_template_styles(template: str) -> dict:
+    """Style metadata for a template, by display name ("Modern Clean") or key ("modern_clean")."""
+    return TEMPLATE_STYLES[get_available_templates().get(template, template)]
+
+TEMPLATES = {}          # key -> page layout (receives `sections` and, when inlined, `css`)
+TEMPLATE_SECTIONS = {}  # key -> {section: source} (each receives `data`)
+
+TEMPLATES["modern_clean"] = r"""
+<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+{% if css %}<style>{{ css }}</style>{% endif %}
 </head>
 <body>
 <div class="page">
+  {{ sections.header }}
+  {{ sections.summary }}
+  <div class="cols">
+    <section>
+      {{ sections.experience }}
+    </section>
+
+    <aside>
+      {{ sections.education }}
+      {{ sections.skills }}
+    </aside>
+  </div>
+</div>
+</body>
+</html>
+"""
+
+TEMPLATE_SECTIONS["modern_clean"] = {
+    "header": r"""
   <h1>{{ data.name or "Lorem Ipsum" }}</h1>
   <div class="titleline">{{ data.title or "Product Designer | UX Strategist | Creative Technologist" }}</div>
   <div class="contact">
@@ -42,14 +186,14 @@ TEMPLATES["modern_clean"] = r"""
     {% if data.contact and data.contact.get('linkedin') %} | <strong>LinkedIn</strong> {{ data.contact.get('linkedin') }}{% endif %}
     {% if data.contact and data.contact.get('github') %} | <strong>GitHub</strong> {{ data.contact.get('github') }}{% endif %}
   </div>
-
+""",
+    "summary": r"""
   {% if data.summary %}
   <h2>Summary</h2>
   <p>{{ data.summary }}</p>
   {% endif %}
-
-  <div class="cols">
-    <section>
+""",
+    "experience": r"""
       <h2>Work Experience</h2>
       {% if data.experience %}
         {% for x in data.experience %}
@@ -72,9 +216,8 @@ TEMPLATES["modern_clean"] = r"""
       {% else %}
         <p><em>Lorem ipsum placeholder experience with crisp bullets and dates.</em></p>
       {% endif %}
-    </section>
-
-    <aside>
+""",
+    "education": r"""
       <h2>Education</h2>
       {% if data.education %}
         {% for e in data.education %}
@@ -92,7 +235,8 @@ TEMPLATES["modern_clean"] = r"""
       {% else %}
         <p><em>Lorem ipsum education block.</em></p>
       {% endif %}
-
+""",
+    "skills": r"""
       <h2>Skills</h2>
       {% set skills = data.skills or {} %}
       <ul>
@@ -105,46 +249,48 @@ TEMPLATES["modern_clean"] = r"""
           <li><strong>Backend:</strong> Python, Flask</li>
         {% endif %}
       </ul>
-    </aside>
-  </div>
-</div>
-</body>
-</html>
-"""
+""",
+}
 
 TEMPLATES["classic_serif"] = r"""
 <!doctype html>
 <html><head><meta charset="utf-8">
-        <style>
-          body { margin:0; font-family: "Georgia", "Times New Roman", serif; color:#222; font-size: 11px; }
-          .page { padding: 42px 50px; }
-          h1 { margin:0 0 4px; font-size:28px; font-weight:700; letter-spacing:.2px; }
-          .rule { height:1px; background:#000; margin:8px 0 12px; }
-          .muted { color:#555; font-size:11px; }
-          h2 { font-size:12px; margin: 14px 0 6px; text-transform:uppercase; letter-spacing:.6px; }
-          li { margin: 3px 0; }
-</style></head>
+        {% if css %}<style>{{ css }}</style>{% endif %}</head>
 <body><div class="page">
+  {{ sections.header }}
+  {{ sections.summary }}
+  {{ sections.experience }}
+  {{ sections.education }}
+  {{ sections.skills }}
+</div></body></html>
+"""
+
+TEMPLATE_SECTIONS["classic_serif"] = {
+    "header": r"""
   <h1>{{ data.name or "J. McJobface" }}</h1>
   <div class="muted">{{ data.contact.email or "hey@sheetstresumee.com" }} | {{ data.contact.phone or "(555) 555-5555" }} | {{ data.contact.location or "Denver, CO" }}</div>
   <div class="rule"></div>
   <div class="muted">{{ data.title or "Product Designer | UX Strategist | Creative Technologist" }}</div>
-
+""",
+    "summary": r"""
   {% if data.summary %}<h2>Professional Summary</h2><p>{{ data.summary }}</p>{% endif %}
-
+""",
+    "experience": r"""
   <h2>Work Experience</h2>
   {% for x in data.experience %}
     <p><strong>{{ x.title }}</strong>, {{ x.company }} <span class="muted">— {{ x.start_date }} – {{ x.end_date }}</span></p>
     {% if x.bullets %}<ul>{% for b in x.bullets %}<li>{{ b }}</li>{% endfor %}</ul>{% endif %}
   {% endfor %}
   {% if not data.experience %}<p><em>Experience placeholder…</em></p>{% endif %}
-
+""",
+    "education": r"""
   <h2>Education</h2>
   {% for e in data.education %}
     <p><strong>{{ e.degree }}</strong>, {{ e.school }} <span class="muted">— {{ e.start_date }} – {{ e.end_date }}</span></p>
   {% endfor %}
   {% if not data.education %}<p><em>Education placeholder…</em></p>{% endif %}
-
+""",
+    "skills": r"""
   <h2>Certifications, Skills & Interests</h2>
   <ul>
     {% for k, v in data.skills.items() if v %}<li><strong>{{ k.replace("_"," ").title() }}:</strong> {{ v|join(", ") }}</li>{% endfor %}
@@ -152,54 +298,195 @@ TEMPLATES["classic_serif"] = r"""
       <li><strong>Skills:</strong> Lorem ipsum dolor sit amet…</li>
     {% endif %}
   </ul>
-</div></body></html>
-"""
+""",
+}
 
 TEMPLATES["compact_two_col"] = r"""
 <!doctype html>
 <html><head><meta charset="utf-8">
-        <style>
-          body { margin:0; font-family: "Inter", system-ui, -apple-system; color:#222; font-size: 11px; }
-          .page { padding: 28px 32px; }
-          .grid { display:grid; grid-template-columns: 1fr 1fr; gap: 18px; }
-          h1 { margin:0; font-size:24px; font-weight:800; }
-          .muted { color:#666; font-size:11px; margin-bottom:6px; }
-          h2 { font-size:11px; margin: 12px 0 6px; text-transform:uppercase; letter-spacing:.6px; }
-          ul { margin:6px 0 8px 18px; }
-</style></head>
+        {% if css %}<style>{{ css }}</style>{% endif %}</head>
 <body><div class="page">
-  <h1>{{ data.name or "Lorem Ipsum" }}</h1>
-  <div class="muted">{{ data.title or "Creative Technologist" }} • {{ data.contact.email or "lorem@ipsum.com" }} • {{ data.contact.phone or "555-555-5555" }}</div>
+  {{ sections.header }}
   <div class="grid">
     <section>
+      {{ sections.experience }}
+    </section>
+    <aside>
+      {{ sections.summary }}
+      {{ sections.education }}
+      {{ sections.skills }}
+    </aside>
+  </div>
+</div></body></html>
+"""
+
+TEMPLATE_SECTIONS["compact_two_col"] = {
+    "header": r"""
+  <h1>{{ data.name or "Lorem Ipsum" }}</h1>
+  <div class="muted">{{ data.title or "Creative Technologist" }} • {{ data.contact.email or "lorem@ipsum.com" }} • {{ data.contact.phone or "555-555-5555" }}</div>
+""",
+    "summary": r"""
+      {% if data.summary %}<h2>Summary</h2><p>{{ data.summary }}</p>{% endif %}
+""",
+    "experience": r"""
       <h2>Experience</h2>
       {% for x in data.experience %}
         <p><strong>{{ x.title }}</strong> — {{ x.company }}<br><span class="muted">{{ x.start_date }} – {{ x.end_date }}{% if x.location %} • {{ x.location }}{% endif %}</span></p>
         {% if x.bullets %}<ul>{% for b in x.bullets %}<li>{{ b }}</li>{% endfor %}</ul>{% endif %}
       {% endfor %}
       {% if not data.experience %}<p><em>Experience placeholder…</em></p>{% endif %}
-    </section>
-    <aside>
-      {% if data.summary %}<h2>Summary</h2><p>{{ data.summary }}</p>{% endif %}
+""",
+    "education": r"""
       <h2>Education</h2>
       {% for e in data.education %}
         <p><strong>{{ e.degree }}</strong>, {{ e.school }}<br><span class="muted">{{ e.start_date }} – {{ e.end_date }}</span></p>
       {% endfor %}
       {% if not data.education %}<p><em>Education placeholder…</em></p>{% endif %}
-
+""",
+    "skills": r"""
       <h2>Skills</h2>
       <ul>
         {% for k, v in data.skills.items() if v %}
           <li><strong>{{ k.replace("_"," ").title() }}:</strong> {{ v|join(", ") }}</li>
         {% endfor %}
       </ul>
-    </aside>
-  </div>
-</div></body></html>
-"""
+""",
+}
+
+# --- Compiled template cache ---
+# One Environment for the whole process; each layout/section is compiled once and shared
+# by every session/script-runner thread (jinja2 Templates are safe to render concurrently).
+
+_ENV = Environment(loader=BaseLoader(), autoescape=True)
+_COMPILED = {}  # (key, section or None) -> Template
+_COMPILE_LOCK = threading.Lock()
+
+def _template_source(key: str, section: str = None) -> str:
+    return TEMPLATES[key] if section is None else TEMPLATE_SECTIONS[key][section]
+
+def get_compiled_template(key: str, section: str = None):
+    """Return the compiled layout (or one section unit) for a template key, compiling it at most once."""
+    ck = (key, section)
+    compiled = _COMPILED.get(ck)
+    if compiled is not None:
+        return compiled
+    with _COMPILE_LOCK:
+        compiled = _COMPILED.get(ck)
+        if compiled is None:
+            compiled = _COMPILED[ck] = _ENV.from_string(_template_source(key, section))
+        return compiled
+
+def warm_templates():
+    """Compile every layout and section up front (called at import so the first preview is cheap)."""
+    for key in TEMPLATES:
+        get_compiled_template(key)
+        for section in TEMPLATE_SECTIONS[key]:
+            get_compiled_template(key, section)
+
+warm_templates()
+
+# --- Render caches ---
+# Content-addressed LRUs shared by all sessions. RENDER_CACHE holds whole pages so reruns that
+# don't touch the resume (selectbox, download clicks) skip Jinja entirely; SECTION_CACHE holds
+# individual section blocks so a page miss only re-renders the sections whose data changed.
+class RenderCache:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
 
-def render_template_html(data: dict, template_name: str) -> str:
+    def get(self, key):
+        with self._lock:
+            html = self._items.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key, html: str):
+        with self._lock:
+            self._items[key] = html
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+RENDER_CACHE = RenderCache(int(os.getenv("RESUME_RENDER_CACHE_SIZE", "256")))
+SECTION_CACHE = RenderCache(int(os.getenv("RESUME_SECTION_CACHE_SIZE", "2048")))
+
+def resume_digest(data) -> str:
+    """Stable content hash of a (normalized) resume or any slice of one."""
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def _section_data(data: dict, section: str) -> dict:
+    return {f: data[f] for f in SECTION_FIELDS[section] if f in data}
+
+def _render_section(key: str, section: str, section_data: dict) -> Markup:
+    return Markup(get_compiled_template(key, section).render(data=section_data))
+
+_PX = re.compile(r"(\d*\.?\d+)px")
+
+@lru_cache(maxsize=64)
+def scaled_css(key: str, scale: float = 1.0) -> str:
+    """The template's stylesheet with every px length multiplied by scale (auto-fit zoom, see fit.py)."""
+    css = TEMPLATE_CSS[key]
+    if scale == 1.0:
+        return css
+    return _PX.sub(lambda m: f"{float(m.group(1)) * scale:.2f}px", css)
+
+def get_template_css(template_name: str, scale: float = 1.0) -> str:
+    return scaled_css(get_available_templates()[template_name], scale)
+
+def _compose(key: str, sections: dict, inline_css: bool, scale: float = 1.0) -> str:
+    css = Markup(scaled_css(key, scale)) if inline_css else None
+    return get_compiled_template(key).render(sections=sections, css=css)
+
+def render_template_html(data: dict, template_name: str, inline_css: bool = True, scale: float = 1.0) -> str:
+    """Render a full page. With inline_css=False the <style> block is left out so the caller can
+    supply the template's stylesheet separately (PDF export parses it once per process)."""
     key = get_available_templates()[template_name]
-    env = Environment(loader=BaseLoader(), autoescape=True)
-    tmpl = env.from_string(TEMPLATES[key])
-    return tmpl.render(data=data)
\ No newline at end of file
+    sections = {s: _render_section(key, s, _section_data(data, s)) for s in SECTIONS}
+    return _compose(key, sections, inline_css, scale)
+
+def render_template_html_cached(data: dict, template_name: str, inline_css: bool = True, scale: float = 1.0) -> str:
+    key = get_available_templates()[template_name]
+    slices = {s: _section_data(data, s) for s in SECTIONS}
+    digests = {s: resume_digest(slices[s]) for s in SECTIONS}
+    page_key = (key, inline_css, scale, tuple(digests[s] for s in SECTIONS))
+    html = RENDER_CACHE.get(page_key)
+    if html is not None:
+        return html
+    sections = {}
+    for s in SECTIONS:
+        section_key = (key, s, digests[s])
+        block = SECTION_CACHE.get(section_key)
+        if block is None:
+            block = _render_section(key, s, slices[s])
+            SECTION_CACHE.put(section_key, block)
+        sections[s] = block
+    html = _compose(key, sections, inline_css, scale)
+    RENDER_CACHE.put(page_key, html)
+    return html
+
+def render_cache_stats() -> dict:
+    return {"pages": RENDER_CACHE.stats(), "sections": SECTION_CACHE.stats()}
@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_handler import ChatHandler, ReplyStreamSplitter, StructuredStreamSplitter
+
+DELTA = {"contact": {"location": "Denver, CO"}}
+REPLY = 'Added your location. Where do you work "now"?'
+
+TAGGED = f"{REPLY}\n<RESUME_DATA_JSON>{json.dumps(DELTA)}</RESUME_DATA_JSON>"
+TAGGED_DELTA_FIRST = f"<RESUME_DATA_JSON>{json.dumps(DELTA)}</RESUME_DATA_JSON>\n{REPLY}"
+STRUCTURED = json.dumps({"reply": REPLY, "delta": DELTA})
+STRUCTURED_DELTA_FIRST = json.dumps({"delta": DELTA, "reply": REPLY})
+
+def _halves(text):
+    return [text[:len(text) // 2], text[len(text) // 2:]]
+
+def _small(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def _run(splitter, chunks):
+    """(visible text, deltas returned by feed, text returned by finish)"""
+    text, deltas = [], []
+    for chunk in chunks:
+        piece, delta = splitter.feed(chunk)
+        text.append(piece)
+        if delta is not None:
+            deltas.append(delta)
+    rest = splitter.finish()
+    return "".join(text) + rest, deltas
+
+# --- Splitters ---
+@pytest.mark.parametrize("split", [lambda t: [t], _halves, _small], ids=["one-chunk", "two-chunk", "small"])
+@pytest.mark.parametrize("reply", [TAGGED, TAGGED_DELTA_FIRST], ids=["reply-first", "delta-first"])
+def test_tag_splitter(split, reply):
+    splitter = ReplyStreamSplitter()
+    text, _ = _run(splitter, split(reply))
+    assert text.strip() == REPLY
+    assert splitter.delta == DELTA
+    assert splitter.problem is None
+
+@pytest.mark.parametrize("split", [lambda t: [t], _halves, _small], ids=["one-chunk", "two-chunk", "small"])
+@pytest.mark.parametrize("reply", [STRUCTURED, STRUCTURED_DELTA_FIRST], ids=["reply-first", "delta-first"])
+def test_structured_splitter(split, reply):
+    splitter = StructuredStreamSplitter()
+    text, _ = _run(splitter, split(reply))
+    assert text == REPLY
+    assert splitter.delta == DELTA
+    assert splitter.problem is None
+    assert not splitter.fell_back
+
+def test_structured_splitter_streams_the_reply_before_the_delta():
+    splitter = StructuredStreamSplitter()
+    first, delta = splitter.feed(STRUCTURED[:30])
+    assert first and REPLY.startswith(first)
+    assert delta is None
+
+def test_structured_splitter_falls_back_to_tags():
+    splitter = StructuredStreamSplitter()
+    text, _ = _run(splitter, _halves(TAGGED))
+    assert splitter.fell_back
+    assert text.strip() == REPLY
+    assert splitter.delta == DELTA
+
+def test_missing_delta_is_a_problem():
+    splitter = ReplyStreamSplitter()
+    _run(splitter, [REPLY])
+    assert splitter.delta is None
+    assert splitter.problem == "missing"
+
+# --- stream_message ---
+class _Completions:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def create(self, **kwargs):
+        return iter(SimpleNamespace(usage=None,
+                                    choices=[SimpleNamespace(delta=SimpleNamespace(content=c, refusal=None))])
+                    for c in self.chunks)
+
+def _handler(chunks, structured):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions(chunks)))
+    handler = ChatHandler(client=client)
+    handler.cache = None
+    handler.local_extraction = False
+    handler.structured_output = "on" if structured else "off"
+    return handler
+
+@pytest.mark.parametrize("split", [lambda t: [t], _halves, _small], ids=["one-chunk", "two-chunk", "small"])
+@pytest.mark.parametrize("reply, structured", [(STRUCTURED, True), (STRUCTURED_DELTA_FIRST, True),
+                                               (TAGGED, False), (TAGGED_DELTA_FIRST, False)],
+                         ids=["structured", "structured-delta-first", "tags", "tags-delta-first"])
+def test_stream_message_yields_the_delta(split, reply, structured):
+    events = list(_handler(split(reply), structured).stream_message("I live in Denver", {}))
+    assert [p for k, p in events if k == "delta"] == [DELTA]
+    assert "".join(p for k, p in events if k == "text").strip() == REPLY
+
+# --- process_message ---
+def _blocking_handler(content):
+    reply = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content, refusal=None))],
+                            usage=None)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: reply)))
+    handler = ChatHandler(client=client)
+    handler.cache = None
+    handler.structured_output = "off"
+    return handler
+
+def test_local_fields_fill_what_the_llm_left_out():
+    llm = {"contact": {"location": "Boulder, CO"}, "experience": [{"title": "Designer", "company": "Spotify"}]}
+    handler = _blocking_handler(f"Added.\n<RESUME_DATA_JSON>{json.dumps(llm)}</RESUME_DATA_JSON>")
+    _, delta = handler.process_message("jane@example.com, Denver, CO. I design at Spotify", {})
+    assert delta["contact"] == {"email": "jane@example.com", "location": "Boulder, CO"}
+    assert delta["experience"] == llm["experience"]
+
+def test_no_empty_contact_without_local_fields():
+    llm = {"experience": [{"title": "Designer", "company": "Spotify"}]}
+    handler = _blocking_handler(f"Added.\n<RESUME_DATA_JSON>{json.dumps(llm)}</RESUME_DATA_JSON>")
+    _, delta = handler.process_message("I design at Spotify", {})
+    assert delta == llm
@@ -0,0 +1,44 @@
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+from docx import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporters import DOCX_BASE_DIR, DOCX_STYLES, build_docx_base, export_docx_from_data
+from templates import TEMPLATE_STYLES, get_available_templates
+
+# --- DOCX bases ---
+def _parts(blob: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(blob)) as z:
+        return {name: z.read(name) for name in z.namelist()}  # zip timestamps differ per build
+
+@pytest.mark.parametrize("key", list(TEMPLATE_STYLES))
+def test_shipped_base_is_up_to_date(key):
+    # regenerate with exporters.write_docx_bases() after changing a template's DOCX styling
+    with open(os.path.join(DOCX_BASE_DIR, f"{key}.docx"), "rb") as f:
+        assert _parts(f.read()) == _parts(build_docx_base(key))
+
+@pytest.mark.parametrize("key", list(TEMPLATE_STYLES))
+def test_base_keeps_only_the_styles_in_use(key):
+    doc = Document(io.BytesIO(build_docx_base(key)))
+    names = {s.name for s in doc.styles}
+    assert set(DOCX_STYLES) <= names
+    assert len(names) < 20
+    assert doc.styles["Normal"].font.name == TEMPLATE_STYLES[key]["docx_font"]
+
+@pytest.mark.parametrize("template_name", list(get_available_templates()))
+def test_export_uses_the_template_styles(template_name):
+    data = {"name": "Jane Doe", "title": "Designer", "contact": {"email": "jane@example.com"},
+            "summary": "Designs things.",
+            "experience": [{"title": "Designer", "company": "Spotify", "start_date": "2019",
+                            "end_date": "Present", "bullets": ["Led the redesign"], "technologies": ["Figma"]}],
+            "education": [{"degree": "BFA", "school": "RISD", "details": ["Honors"]}],
+            "skills": {"design": ["Figma", "Sketch"]}}
+    doc = Document(io.BytesIO(export_docx_from_data(data, template_name)))
+    styles = [p.style.name for p in doc.paragraphs if p.text]
+    assert styles[:3] == ["Title", "Resume Subtitle", "Resume Contact"]
+    assert {"Heading 1", "Resume Role", "Resume Meta", "List Bullet", "Resume Tech"} <= set(styles)
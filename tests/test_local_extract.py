@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_extract import extract
+
+EMPTY = {}
+
+# --- Bare locations ---
+@pytest.mark.parametrize("message", [
+    "Python, Django",
+    "MIT, Computer Science",
+    "Google, Amazon",
+    "Jane Doe, PhD",
+    "Senior Designer, Spotify",
+    "Acme, Inc",
+])
+def test_comma_separated_phrases_are_not_locations(message):
+    assert extract(message, EMPTY) is None
+
+@pytest.mark.parametrize("message, place", [
+    ("Denver, CO", "Denver, CO"),
+    ("I'm in Austin, TX", "Austin, TX"),
+    ("Toronto, Canada", "Toronto, Canada"),
+    ("Cape Town, South Africa", "Cape Town, South Africa"),
+    ("remote", "Remote"),
+])
+def test_bare_location_is_applied_but_not_complete(message, place):
+    result = extract(message, EMPTY)
+    assert result.delta == {"contact": {"location": place}}
+    assert not result.complete
+    assert result.reply == ""
+
+def test_bare_location_next_to_other_fields_is_not_complete():
+    result = extract("jane@example.com, Denver, CO", EMPTY)
+    assert result.delta["contact"] == {"email": "jane@example.com", "location": "Denver, CO"}
+    assert not result.complete
+
+def test_cued_location():
+    result = extract("I'm based in Lisbon, Portugal and my email is jane@example.com", EMPTY)
+    assert result.delta["contact"] == {"email": "jane@example.com", "location": "Lisbon, Portugal"}
+    assert result.complete
+
+# --- Contact fields ---
+def test_contact_only_message_is_complete():
+    result = extract("my email is jane@example.com and phone +1 (303) 555-0142", EMPTY)
+    assert result.delta == {"contact": {"email": "jane@example.com", "phone": "+1 (303) 555-0142"}}
+    assert result.complete
+    assert result.reply.startswith("Added your email and phone number.")
+
+@pytest.mark.parametrize("phone", ["555-010-0000", "(303) 555-0142", "303.555.0142", "1-800-555-0100",
+                                   "+44 20 7946 0958", "+4915112345678", "020 7946 0958", "5550100000"])
+def test_phone_formats(phone):
+    assert extract(f"phone {phone}", EMPTY).delta == {"contact": {"phone": phone}}
+
+@pytest.mark.parametrize("message", ["Order ids 12345 67890 123", "id 1234-5678-9012", "from 2019 2020 to 12"])
+def test_digit_groups_are_not_phone_numbers(message):
+    result = extract(message, EMPTY)
+    assert result is None or "phone" not in result.delta.get("contact", {})
+
+def test_other_content_goes_to_the_llm():
+    result = extract("my email is jane@example.com, and I worked at Acme as a designer", EMPTY)
+    assert result.delta == {"contact": {"email": "jane@example.com"}}
+    assert not result.complete
+
+def test_nothing_to_extract():
+    assert extract("I led the payments platform rewrite", EMPTY) is None
+
+# --- Dates ---
+def test_date_range_for_the_undated_entry():
+    resume = {"name": "Jane", "experience": [{"title": "Designer", "company": "Spotify"}]}
+    result = extract("2019 - present", resume)
+    assert result.delta == {"experience": [{"start_date": "2019", "end_date": "Present"}]}
+    assert result.complete
+
+def test_ambiguous_date_range_goes_to_the_llm():
+    resume = {"experience": [{"title": "Designer"}], "education": [{"school": "MIT"}]}
+    assert extract("2015 - 2019", resume) is None